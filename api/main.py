@@ -1,20 +1,134 @@
-import dataclasses
 import sys
 import os
-from datetime import datetime, timedelta, timezone
+import asyncio
+import gzip
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import timedelta
 
-from fastapi import FastAPI, HTTPException, Query
+import aiohttp
+import orjson
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+try:
+    import brotli
+except ImportError:         # optional — /player falls back to gzip without it
+    brotli = None
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from player_scanner import (
     scan_player,
-    compute_filtered_analysis,
+    scan_players,
+    get_match_page,
+    compute_champion_pool,
+    build_analysis_grid,
     get_per_minute_comparison,
+    refresh_ddragon_version,
+    AnalysisGrid,
 )
+from player_scanner.benchmark import benchmark_cache_stats, refresh_benchmarks
+from player_scanner.cache import LRUCache
+from player_scanner.shared_cache import SQLiteCache
+from player_scanner.singleflight import SingleFlight
+from backend.fetch_functions.riot_client import RiotClient, scheduler_stats
+from backend import metrics
+from db.client import warm_pool
+
+# ---------------------------------------------------------------------------
+# Application-lifetime HTTP session
+# One connection pool for the whole process so repeat requests to
+# americas/na1.api.riotgames.com and DDragon skip DNS + TLS setup.
+# ---------------------------------------------------------------------------
+_HTTP_LIMIT          = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+_HTTP_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+_RIOT_CONCURRENCY    = 15
+
+_riot: RiotClient | None = None
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Warm-up
+# Before serving, load the DDragon version, open the DB pool and run the
+# common benchmark queries, so the first requests after a deploy are as fast
+# as the rest. Every STATIC_REFRESH_SECONDS the DDragon version is refreshed
+# and benchmarks are re-warmed if the pipeline published a new dataset.
+# ---------------------------------------------------------------------------
+_WARMUP_TIMEOUT         = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "20"))
+_STATIC_REFRESH_SECONDS = float(os.getenv("STATIC_REFRESH_SECONDS", "600"))
+
+
+async def _warm_up():
+    async def _database():
+        await warm_pool()
+        await refresh_benchmarks()
+
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(refresh_ddragon_version(_riot), _database(), return_exceptions=True),
+            timeout=_WARMUP_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        # Serve anyway — whatever didn't finish loads on first use
+        logger.warning("Warm-up did not finish within %ss", _WARMUP_TIMEOUT)
+        return
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("Warm-up step failed: %s", result)
+
+
+async def _refresh_static():
+    while True:
+        await asyncio.sleep(_STATIC_REFRESH_SECONDS)
+        try:
+            await asyncio.gather(refresh_ddragon_version(_riot), refresh_benchmarks())
+        except Exception:
+            # Keep serving what was loaded last; the next interval tries again
+            logger.exception("Static data refresh failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _riot
+    connector = aiohttp.TCPConnector(
+        limit=_HTTP_LIMIT,
+        limit_per_host=_HTTP_LIMIT_PER_HOST,
+        ttl_dns_cache=300,          # seconds; aiohttp default is 10
+        keepalive_timeout=60,
+        enable_cleanup_closed=True,
+    )
+    session = aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=30),
+    )
+    _riot = RiotClient(session, max_concurrency=_RIOT_CONCURRENCY)
+    await _warm_up()
+    background = [
+        asyncio.create_task(_sweep_cache()),
+        asyncio.create_task(_watch_loop_lag()),
+        asyncio.create_task(_refresh_static()),
+    ]
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        _riot = None
+        await session.close()
+
 
-app = FastAPI(title="Heimer API", version="0.1.0")
+app = FastAPI(
+    title="Heimer API",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 _origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
 app.add_middleware(
@@ -22,36 +136,288 @@ app.add_middleware(
     allow_origins=_origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Scan-Stale"],
 )
 
+
+class _GZipMiddleware(GZipMiddleware):
+    """GZipMiddleware minus the NDJSON streams: gzip would hold their lines
+    back until a compressed block fills, defeating the streaming."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/stream"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Everything except /player (which carries its own pre-compressed bodies)
+# and the /stream endpoints
+app.add_middleware(_GZipMiddleware, minimum_size=1000, compresslevel=6)
+
 # ---------------------------------------------------------------------------
-# Simple in-memory cache  {cache_key: (data, expires_at)}
+# Scan cache
 # Avoids redundant Riot API calls when analysis + timeline hit back-to-back.
+# LRU with a byte budget on the estimated size of each scan; expired entries
+# are swept in the background (see lifespan).
+#
+# A scan is fresh for _CACHE_TTL. For _CACHE_STALE after that it is still
+# served straight from the cache, flagged with X-Scan-Stale, while a
+# background re-scan replaces it (stale-while-revalidate).
 # ---------------------------------------------------------------------------
-_cache: dict = {}
-_CACHE_TTL = timedelta(minutes=5)
+_CACHE_TTL           = timedelta(minutes=5)
+_CACHE_STALE         = timedelta(minutes=int(os.getenv("SCAN_CACHE_STALE_MINUTES", "60")))
+_CACHE_MAX_ENTRIES   = int(os.getenv("SCAN_CACHE_MAX_ENTRIES", "10000"))
+_CACHE_MAX_BYTES     = int(os.getenv("SCAN_CACHE_MAX_MB", "256")) * 1024 * 1024
+_CACHE_SWEEP_SECONDS = 60
+
+# Python objects for a scan take roughly 3x the bytes of its JSON encoding.
+# The /player bodies are only rendered if /player is requested (see
+# _render_player); budget for them up front, as the JSON plus ~30% for the
+# gzip and brotli variants, so the entry's size doesn't change afterwards.
+_OBJECT_OVERHEAD = 3
+_RENDERED_OVERHEAD = 1.3
+
+
+def _scan_size(data: dict) -> int:
+    raw = len(orjson.dumps(_public_scan(data)))
+    return int((_OBJECT_OVERHEAD + _RENDERED_OVERHEAD) * raw)
+
+
+_FRESH_UNTIL = "_fresh_until"      # wall-clock, so every worker agrees
+_MAX_AGE = (_CACHE_TTL + _CACHE_STALE).total_seconds()
+
+_cache = LRUCache(
+    max_entries=_CACHE_MAX_ENTRIES,
+    ttl=_MAX_AGE,
+    max_bytes=_CACHE_MAX_BYTES,
+    sizeof=_scan_size,
+)
+
+# Optional second level shared by every worker on the host. Set SCAN_CACHE_DB
+# to a file path (e.g. /tmp/heimer-scans.sqlite) when running with
+# `uvicorn --workers N` so a player scanned by one worker is a hit in all.
+_SHARED_CACHE_DB = os.getenv("SCAN_CACHE_DB")
+_shared_cache = SQLiteCache(_SHARED_CACHE_DB, ttl=_MAX_AGE) if _SHARED_CACHE_DB else None
+
+metrics.register_cache("scan", _cache)
+if _shared_cache is not None:
+    metrics.register_cache("scan_shared", _shared_cache)
+
+# /player, /analysis and /timeline arrive together on page load — concurrent
+# cache misses for the same player share one scan instead of running three.
+# Background revalidations and /stream go through the same single-flight;
+# each running scan publishes its events so a stream can join it midway.
+_scans_inflight = SingleFlight()
+_scan_progress: dict[str, "_ScanEvents"] = {}
+_revalidations: set[asyncio.Task] = set()
+
+
+class _ScanEvents:
+    """The events of an in-flight scan so far, replayed to each subscriber
+    and then followed live until the scan finishes."""
+
+    def __init__(self):
+        self._events: list[tuple[str, object]] = []
+        self._done = False
+        self._changed = asyncio.Event()
+
+    def publish(self, event: str, payload):
+        self._events.append((event, payload))
+        self._wake()
+
+    def close(self):
+        self._done = True
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self):
+        seen = 0
+        while True:
+            while seen < len(self._events):
+                yield self._events[seen]
+                seen += 1
+            if self._done:
+                return
+            await self._changed.wait()
 
 
 def _cache_key(game_name: str, tag_line: str, platform: str) -> str:
     return f"{game_name}#{tag_line}@{platform}".lower()
 
 
-async def _get_scan(game_name: str, tag_line: str, platform: str) -> dict:
+async def _get_scan(game_name: str, tag_line: str, platform: str) -> tuple[dict, bool]:
+    """
+    Return (scan, stale). A stale scan is returned immediately and a
+    background re-scan is started; a miss waits for the scan.
+    """
     key = _cache_key(game_name, tag_line, platform)
-    now = datetime.now(tz=timezone.utc)
-    if key in _cache:
-        data, expires = _cache[key]
-        if now < expires:
-            return data
-    data = await scan_player(game_name, tag_line, platform)
+    cached = _cached_scan(key, game_name, tag_line, platform)
+    if cached is not None:
+        return cached
+    scan, _ = _start_scan(key, game_name, tag_line, platform)
+    return await asyncio.shield(scan), False
+
+
+def _start_scan(key: str, game_name: str, tag_line: str, platform: str) -> tuple[asyncio.Future, _ScanEvents]:
+    """Start a scan for `key`, or join the one in flight. Returns its result
+    future and its progress events."""
+    joining = key in _scans_inflight
+    progress = _scan_progress[key] if joining else _ScanEvents()
+    scan = _scans_inflight.start(key, _scan_and_cache, key, progress, game_name, tag_line, platform)
+    if not joining:
+        _scan_progress[key] = progress
+        # Runs right after SingleFlight releases the key, so a scan in flight
+        # always has its events registered
+        scan.add_done_callback(lambda _: _scan_progress.pop(key, None))
+    return scan, progress
+
+
+def _cached_scan(key: str, game_name: str, tag_line: str, platform: str) -> tuple[dict, bool] | None:
+    """(scan, stale) from the cache, or None on a miss. Starts a background
+    re-scan when the cached copy is stale."""
+    data = _cache.get(key)
+    if data is None and _shared_cache is not None:
+        found = _shared_cache.get_with_ttl(key)
+        if found is not None:
+            data, remaining = found
+            _cache.set(key, data, ttl=remaining)    # expire with the shared copy
+    if data is None:
+        return None
+
+    stale = time.time() >= data.get(_FRESH_UNTIL, 0)
+    if stale and key not in _scans_inflight:
+        task = asyncio.create_task(_revalidate(key, game_name, tag_line, platform))
+        _revalidations.add(task)
+        task.add_done_callback(_revalidations.discard)
+    return data, stale
+
+
+async def _revalidate(key: str, game_name: str, tag_line: str, platform: str):
+    try:
+        scan, _ = _start_scan(key, game_name, tag_line, platform)
+        await asyncio.shield(scan)
+    except Exception:
+        # Keep serving the stale copy; the next request past TTL tries again
+        logger.exception("Background re-scan failed for %s", key)
+
+
+async def _scan_and_cache(key: str, progress: _ScanEvents, game_name: str, tag_line: str, platform: str) -> dict:
+    try:
+        data = await scan_player(game_name, tag_line, platform, riot=_riot, on_event=progress.publish)
+    finally:
+        progress.close()
     if "error" not in data:
-        _cache[key] = (data, now + _CACHE_TTL)
+        _store_scan(key, data)
     return data
 
 
-def _serialize(obj) -> dict:
-    """Convert a dataclass (possibly nested) to a JSON-safe dict."""
-    return jsonable_encoder(dataclasses.asdict(obj))
+def _store_scan(key: str, data: dict):
+    data[_FRESH_UNTIL] = time.time() + _CACHE_TTL.total_seconds()
+    _analysis_grid(data)
+    _cache.set(key, data)
+    if _shared_cache is not None:
+        _shared_cache.set(key, data)
+
+
+async def _sweep_cache():
+    while True:
+        await asyncio.sleep(_CACHE_SWEEP_SECONDS)
+        _cache.sweep()
+        if _shared_cache is not None:
+            _shared_cache.sweep()
+
+
+_LOOP_LAG_INTERVAL = 0.5
+
+
+async def _watch_loop_lag():
+    """Sleep on a fixed interval and record how late each wake-up is — time the
+    loop spent blocked on CPU work or synchronous I/O."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(_LOOP_LAG_INTERVAL)
+        metrics.EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - start - _LOOP_LAG_INTERVAL))
+
+
+def _json(content) -> ORJSONResponse:
+    """
+    Encode scanner dataclasses straight to JSON bytes. orjson serializes
+    dataclasses, datetimes and nested lists natively, with the same shapes as
+    dataclasses.asdict + jsonable_encoder. Returning the Response ourselves
+    also skips FastAPI's own jsonable_encoder pass over the result.
+    See benchmarks/serialize_bench.py.
+    """
+    return ORJSONResponse(content)
+
+
+# Set on responses built from a scan older than _CACHE_TTL
+_STALE_HEADER = "X-Scan-Stale"
+
+
+def _mark_stale(response: Response, stale: bool) -> Response:
+    if stale:
+        response.headers[_STALE_HEADER] = "1"
+    return response
+
+
+# ---------------------------------------------------------------------------
+# /player body, rendered once per cached scan
+# The JSON, its ETag and the compressed variants are built on the first
+# /player request for a scan and stored on the scan dict, so repeat requests
+# (and 304s) never touch orjson or the compressors again, and scans only
+# read through /analysis or /timeline never pay for them.
+# ---------------------------------------------------------------------------
+_RENDERED = "_player_body"
+
+
+class _RenderedBody:
+    __slots__ = ("etag", "identity", "gzip", "br")
+
+    def __init__(self, body: bytes):
+        # Derived from the content, so a re-scan with no new games keeps the
+        # same ETag. Weak because the gzip/br variants share it.
+        self.etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.identity = body
+        self.gzip = gzip.compress(body, compresslevel=6)
+        self.br = brotli.compress(body, quality=5) if brotli is not None else None
+
+
+def _render_player(data: dict) -> _RenderedBody:
+    rendered = data.get(_RENDERED)
+    if rendered is None:
+        rendered = _RenderedBody(orjson.dumps(_public_scan(data)))
+        data[_RENDERED] = rendered
+    return rendered
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison against an If-None-Match header (RFC 9110 §13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _accepts(accept_encoding: str, coding: str) -> bool:
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        if name.strip() != coding:
+            continue
+        q = params.strip()
+        if not q.startswith("q="):
+            return True
+        try:
+            return float(q[2:]) > 0
+        except ValueError:
+            return False
+    return False
 
 
 # ---------------------------------------------------------------------------
@@ -62,23 +428,229 @@ def _serialize(obj) -> dict:
 async def get_player(
     game_name: str,
     tag_line: str,
+    request: Request,
     platform: str = Query(default="na1"),
 ):
     """
-    Full player scan: profile, last 20 ranked matches, champion pool.
-    Results are cached for 5 minutes.
+    Full player scan: profile, last 20 ranked matches, champion pool, and
+    total_matches (the rest are paged in through /matches).
+    Results are fresh for 5 minutes, then served stale (X-Scan-Stale) while
+    a background re-scan runs. Sends an ETag and answers a matching
+    If-None-Match with 304; the body is br/gzip encoded when accepted.
     """
-    data = await _get_scan(game_name, tag_line, platform)
+    data, stale = await _get_scan(game_name, tag_line, platform)
     if "error" in data:
         raise HTTPException(status_code=404, detail=data["error"])
 
+    rendered = _render_player(data)
+    headers = {"ETag": rendered.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if stale:
+        headers[_STALE_HEADER] = "1"
+    if _etag_matches(request.headers.get("if-none-match"), rendered.etag):
+        return Response(status_code=304, headers=headers)
+
+    accept = request.headers.get("accept-encoding", "")
+    if rendered.br is not None and _accepts(accept, "br"):
+        body, headers["Content-Encoding"] = rendered.br, "br"
+    elif _accepts(accept, "gzip"):
+        body, headers["Content-Encoding"] = rendered.gzip, "gzip"
+    else:
+        body = rendered.identity
+    return Response(body, media_type="application/json", headers=headers)
+
+
+@app.get("/player/{game_name}/{tag_line}/stream")
+async def stream_player(
+    game_name: str,
+    tag_line: str,
+    platform: str = Query(default="na1"),
+):
+    """
+    The /player scan as NDJSON, one {"type": ..., "data": ...} object per line:
+    "profile" first, then "match_ids" (the last 100 ranked match IDs, newest
+    first; their count is /player's total_matches, and /matches pages through
+    them), then one "match" per game on the first page as it is fetched (not
+    in date order), then "champion_pool" over that page. A player that can't
+    be found yields a single "error" line. Cached scans are replayed from the
+    cache. Otherwise the stream follows the scan shared with /player,
+    /analysis and /timeline, joining it from the start if one is already
+    running, and the result is cached for them.
+    """
+    key = _cache_key(game_name, tag_line, platform)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    cached = _cached_scan(key, game_name, tag_line, platform)
+    if cached is not None:
+        data, stale = cached
+        events = _replay_scan(data)
+        if stale:
+            headers[_STALE_HEADER] = "1"
+    else:
+        events = _stream_scan(key, game_name, tag_line, platform)
+    return StreamingResponse(_ndjson(events), media_type="application/x-ndjson", headers=headers)
+
+
+async def _stream_scan(key: str, game_name: str, tag_line: str, platform: str):
+    scan, progress = _start_scan(key, game_name, tag_line, platform)
+    async for event, payload in progress.subscribe():
+        yield event, payload
+    # Surfaces a failed scan; the scan keeps running if the client goes away
+    await asyncio.shield(scan)
+
+
+async def _replay_scan(data: dict):
+    if "error" in data:
+        yield "error", data["error"]
+        return
+    yield "profile", data["profile"]
+    yield "match_ids", data["match_ids"]
+    for m in data["recent_matches"]:
+        yield "match", m
+    yield "champion_pool", data["champion_pool"]
+
+
+async def _ndjson(events):
+    async for event, payload in events:
+        yield orjson.dumps({"type": event, "data": payload}) + b"\n"
+
+
+_BATCH_MAX_PLAYERS = 20
+
+
+class BatchScanRequest(BaseModel):
+    players:  list[str] = Field(min_length=1, max_length=_BATCH_MAX_PLAYERS)   # Riot IDs, "Name#TAG"
+    platform: str = "na1"
+
+
+@app.post("/players/batch")
+async def scan_batch(body: BatchScanRequest):
+    """
+    Scan several players at once (a lobby, a team roster). Matches shared
+    between them are fetched once. Returns one entry per requested Riot ID,
+    in order: {"riot_id", "profile", "recent_matches", "champion_pool"} or
+    {"riot_id", "error"}. Players with a cached scan are served from cache,
+    and every new scan is cached for the single-player endpoints.
+    """
+    riot_ids = []
+    for riot_id in body.players:
+        game_name, sep, tag_line = riot_id.rpartition("#")
+        if not sep or not game_name or not tag_line:
+            raise HTTPException(status_code=422, detail=f"Invalid Riot ID '{riot_id}', expected Name#TAG.")
+        riot_ids.append((game_name, tag_line))
+
+    keys = [_cache_key(g, t, body.platform) for g, t in riot_ids]
+    results: dict[str, dict] = {}
+    for key, (g, t) in zip(keys, riot_ids):
+        cached = _cached_scan(key, g, t, body.platform)
+        if cached is not None:
+            results[key] = cached[0]
+
+    to_scan = list({key: rid for key, rid in zip(keys, riot_ids) if key not in results}.items())
+    if to_scan:
+        scans = await scan_players([rid for _, rid in to_scan], body.platform, riot=_riot)
+        for (key, _), data in zip(to_scan, scans):
+            if "error" not in data:
+                _store_scan(key, data)
+            results[key] = data
+
+    return _json([
+        {"riot_id": riot_id, **_public_scan(results[key])}
+        for riot_id, key in zip(body.players, keys)
+    ])
+
+
+def _public_scan(data: dict) -> dict:
+    if "error" in data:
+        return {"error": data["error"]}
     return {
-        "profile":        _serialize(data["profile"]),
-        "recent_matches": [_serialize(m) for m in data["recent_matches"]],
-        "champion_pool":  [_serialize(c) for c in data["champion_pool"]],
+        "profile":        data["profile"],
+        "recent_matches": data["recent_matches"],
+        "total_matches":  len(data["match_ids"]),
+        "champion_pool":  data["champion_pool"],
     }
 
 
+async def _recent_matches(data: dict, platform: str, count: int | None) -> list:
+    """The player's `count` most recent games; by default the first page that
+    came with the scan. Pages beyond it are fetched on demand."""
+    if count is None or count <= len(data["recent_matches"]):
+        return data["recent_matches"][:count]
+    return await get_match_page(data["profile"].puuid, data["match_ids"], platform, 0, count, riot=_riot)
+
+
+# Analysis grids per number of recent games, memoized on the scan dict like
+# the /player bodies
+_ANALYSIS = "_analysis_grids"
+
+
+def _analysis_grid(data: dict) -> AnalysisGrid:
+    """Every role/champion aggregate over the scan's first page, built once
+    when the scan is cached so /analysis is a lookup."""
+    grids = data.setdefault(_ANALYSIS, {})
+    count = len(data["recent_matches"])
+    grid = grids.get(count)
+    if grid is None:
+        grid = grids[count] = build_analysis_grid(data["recent_matches"])
+    return grid
+
+
+async def _grid_for(data: dict, platform: str, count: int | None) -> AnalysisGrid:
+    """The grid over the `count` most recent games, built on the first request
+    for that count and reused by later /analysis and /analysis/options calls."""
+    if count is None:
+        return _analysis_grid(data)
+    count = min(count, len(data["match_ids"]))
+    grids = data.setdefault(_ANALYSIS, {})
+    grid = grids.get(count)
+    if grid is None:
+        grid = grids[count] = build_analysis_grid(await _recent_matches(data, platform, count))
+    return grid
+
+
+# Number of recent games an endpoint aggregates over (default: first page)
+_MATCHES_QUERY = Query(default=None, ge=1, le=100)
+
+
+@app.get("/player/{game_name}/{tag_line}/matches")
+async def get_matches(
+    game_name: str,
+    tag_line:  str,
+    platform:  str = Query(default="na1"),
+    offset:    int = Query(default=0, ge=0, le=99),
+    limit:     int = Query(default=20, ge=1, le=100),
+):
+    """
+    One page of match history, newest first. Only the first page is fetched
+    by the scan; later pages are fetched from Riot on first request.
+    """
+    data, stale = await _get_scan(game_name, tag_line, platform)
+    if "error" in data:
+        raise HTTPException(status_code=404, detail=data["error"])
+
+    matches = await get_match_page(data["profile"].puuid, data["match_ids"], platform, offset, limit, riot=_riot)
+    return _mark_stale(_json({
+        "offset":  offset,
+        "limit":   limit,
+        "total":   len(data["match_ids"]),
+        "matches": matches,
+    }), stale)
+
+
+@app.get("/player/{game_name}/{tag_line}/champions")
+async def get_champion_pool(
+    game_name: str,
+    tag_line:  str,
+    platform:  str = Query(default="na1"),
+    matches:   int | None = _MATCHES_QUERY,
+):
+    """Champion pool over the player's `matches` most recent games."""
+    data, stale = await _get_scan(game_name, tag_line, platform)
+    if "error" in data:
+        raise HTTPException(status_code=404, detail=data["error"])
+
+    recent = await _recent_matches(data, platform, matches)
+    return _mark_stale(_json(compute_champion_pool(recent)), stale)
+
+
 @app.get("/player/{game_name}/{tag_line}/analysis")
 async def get_analysis(
     game_name: str,
@@ -86,23 +658,44 @@ async def get_analysis(
     platform: str = Query(default="na1"),
     role:     str | None = Query(default=None),
     champion: str | None = Query(default=None),
+    matches:  int | None = _MATCHES_QUERY,
 ):
     """
-    Aggregate stats for a player filtered by role and/or champion.
+    Aggregate stats for a player filtered by role and/or champion, over the
+    `matches` most recent games (default: the first page).
     Returns None (204) if no matching games found.
     """
-    data = await _get_scan(game_name, tag_line, platform)
+    data, stale = await _get_scan(game_name, tag_line, platform)
     if "error" in data:
         raise HTTPException(status_code=404, detail=data["error"])
 
-    analysis = compute_filtered_analysis(data["recent_matches"], role=role, champion=champion)
+    analysis = (await _grid_for(data, platform, matches)).get(role, champion)
     if analysis is None:
         raise HTTPException(
             status_code=404,
             detail=f"No games found for {game_name} playing {champion or 'any champion'} as {role or 'any role'}.",
         )
 
-    return _serialize(analysis)
+    return _mark_stale(_json(analysis), stale)
+
+
+@app.get("/player/{game_name}/{tag_line}/analysis/options")
+async def get_analysis_options(
+    game_name: str,
+    tag_line:  str,
+    platform:  str = Query(default="na1"),
+    matches:   int | None = _MATCHES_QUERY,
+):
+    """
+    Every role, champion and role+champion filter /analysis can answer for
+    this player, each with its game count, most played first.
+    """
+    data, stale = await _get_scan(game_name, tag_line, platform)
+    if "error" in data:
+        raise HTTPException(status_code=404, detail=data["error"])
+
+    grid = await _grid_for(data, platform, matches)
+    return _mark_stale(_json(grid.options()), stale)
 
 
 @app.get("/player/{game_name}/{tag_line}/timeline")
@@ -113,24 +706,54 @@ async def get_timeline(
     role:      str | None = Query(default=None),
     champion:  str | None = Query(default=None),
     ranks:     list[str] = Query(default=["CHALLENGER", "GRANDMASTER", "MASTER"]),
+    matches:   int | None = _MATCHES_QUERY,
+    patches:   int | None = Query(default=None, ge=1, le=10),
 ):
     """
-    Per-minute stats vs benchmark for filtered matches.
+    Per-minute stats vs benchmark for filtered matches among the `matches`
+    most recent games (default: the first page).
     ranks controls which tier(s) to benchmark against — default all three.
+    patches limits the benchmark to the newest N patches — default all retained.
     """
-    data = await _get_scan(game_name, tag_line, platform)
+    data, stale = await _get_scan(game_name, tag_line, platform)
     if "error" in data:
         raise HTTPException(status_code=404, detail=data["error"])
 
     puuid = data["profile"].puuid
+    recent = await _recent_matches(data, platform, matches)
     snapshots = await get_per_minute_comparison(
-        data["recent_matches"], puuid, platform=platform,
-        role=role, champion=champion, ranks=ranks,
+        recent, puuid, platform=platform,
+        role=role, champion=champion, ranks=ranks, riot=_riot, patches=patches,
     )
 
-    return [_serialize(s) for s in snapshots]
+    return _mark_stale(_json(snapshots), stale)
 
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (per worker process)."""
+    rendered = metrics.render()
+    if rendered is None:
+        raise HTTPException(status_code=501, detail="prometheus_client is not installed.")
+    body, content_type = rendered
+    return Response(body, media_type=content_type)
+
+
+@app.get("/stats")
+async def stats():
+    """Runtime counters: Riot request queue depth and wait time per priority
+    class, scan cache size / hit ratio / evictions, and the benchmark cache's
+    dataset version, hit ratio and most requested filters."""
+    out = {
+        "riot_scheduler":  scheduler_stats(),
+        "scan_cache":      _cache.stats(),
+        "benchmark_cache": benchmark_cache_stats(),
+    }
+    if _shared_cache is not None:
+        out["shared_scan_cache"] = _shared_cache.stats()
+    return out
\ No newline at end of file
@@ -0,0 +1,143 @@
+"""
+Local snapshot of DDragon static data: versions.json and per-version item.json.
+
+    <root>/versions.json                     refreshed when older than DDRAGON_VERSIONS_MAX_AGE
+    <root>/items/<version>.json              immutable once written
+    <file>.sha256                            checksum of the file next to it
+
+Readers verify the checksum and treat a mismatch as a miss, so a torn or
+corrupted file is re-fetched rather than parsed. When DDragon is slow or
+unreachable, reads fall back to whatever is on disk — a stale versions list
+is better than none, and item catalogs never change.
+
+Failures are logged, never raised — callers get [] / None like a non-200.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_DIR          = os.getenv("DDRAGON_STORE_DIR", os.path.join(_REPO_ROOT, "data", "ddragon"))
+VERSIONS_MAX_AGE     = float(os.getenv("DDRAGON_VERSIONS_MAX_AGE", "3600"))
+_FETCH_TIMEOUT       = aiohttp.ClientTimeout(total=float(os.getenv("DDRAGON_TIMEOUT_SECONDS", "10")))
+
+VERSIONS_URL = "https://ddragon.leagueoflegends.com/api/versions.json"
+ITEMS_URL    = "https://ddragon.leagueoflegends.com/cdn/{version}/data/en_US/item.json"
+
+
+class DDragonStore:
+    def __init__(self, root: str = DEFAULT_DIR, versions_max_age: float = VERSIONS_MAX_AGE):
+        self.root = root
+        self.versions_max_age = versions_max_age
+
+    def _versions_path(self) -> str:
+        return os.path.join(self.root, "versions.json")
+
+    def _items_path(self, version: str) -> str:
+        return os.path.join(self.root, "items", f"{version}.json")
+
+    # ------------------------------------------------------------------
+    # Checksummed file access
+    # ------------------------------------------------------------------
+
+    def _read(self, path: str) -> bytes | None:
+        """File contents if present and matching its checksum, else None."""
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+            with open(path + ".sha256") as f:
+                expected = f.read().strip()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("DDragon store read failed for %s: %s", path, e)
+            return None
+        if hashlib.sha256(body).hexdigest() != expected:
+            logger.warning("DDragon store checksum mismatch for %s — ignoring it", path)
+            return None
+        return body
+
+    def _write(self, path: str, body: bytes):
+        """Write the file, then its checksum, each atomically."""
+        tmp = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            for target, data in ((path, body), (path + ".sha256", hashlib.sha256(body).hexdigest().encode())):
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, target)
+                tmp = None
+        except OSError as e:
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            logger.warning("DDragon store write failed for %s: %s", path, e)
+
+    def _age(self, path: str) -> float | None:
+        try:
+            return time.time() - os.path.getmtime(path)
+        except OSError:
+            return None
+
+    # ------------------------------------------------------------------
+    # Fetch-through readers
+    # ------------------------------------------------------------------
+
+    async def _download(self, session: aiohttp.ClientSession, url: str) -> bytes | None:
+        try:
+            async with session.get(url, timeout=_FETCH_TIMEOUT) as r:
+                if r.status != 200:
+                    logger.warning("DDragon HTTP %s: %s", r.status, url)
+                    return None
+                body = await r.read()
+            json.loads(body)        # don't store an error page
+            return body
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.warning("DDragon fetch failed for %s: %s", url, e)
+            return None
+
+    async def versions(self, session: aiohttp.ClientSession) -> list[str]:
+        """All DDragon versions, newest first. Served from disk while younger
+        than versions_max_age; after that re-fetched, falling back to disk."""
+        path = self._versions_path()
+        local = await asyncio.to_thread(self._read, path)
+        age = self._age(path)
+        if local is not None and age is not None and age < self.versions_max_age:
+            return json.loads(local)
+
+        body = await self._download(session, VERSIONS_URL)
+        if body is not None:
+            await asyncio.to_thread(self._write, path, body)
+            return json.loads(body)
+        return json.loads(local) if local is not None else []
+
+    async def items(self, session: aiohttp.ClientSession, version: str) -> dict | None:
+        """item.json for a full DDragon version such as "14.23.1"."""
+        path = self._items_path(version)
+        body = await asyncio.to_thread(self._read, path)
+        if body is None:
+            body = await self._download(session, ITEMS_URL.format(version=version))
+            if body is None:
+                return None
+            await asyncio.to_thread(self._write, path, body)
+        return json.loads(body)
+
+    async def prefetch_items(self, session: aiohttp.ClientSession, versions: list[str]) -> dict[str, dict | None]:
+        """items() for several versions concurrently; missing ones are downloaded in parallel."""
+        results = await asyncio.gather(*[self.items(session, v) for v in versions])
+        return dict(zip(versions, results))
+
+
+ddragon_store = DDragonStore()
@@ -5,11 +5,11 @@ This script removes duplicate match IDs.
 import os
 import pandas as pd
 import logging
-import requests
-import time
 import argparse
 from dotenv import load_dotenv
 
+from backend.fetch_functions.riot_client import get_sync
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -17,47 +17,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Ensure your Riot API key is set
 load_dotenv()
-KEY = os.getenv('API_KEY')
 
 # Define API endpoints
 MATCH_API = 'https://americas.api.riotgames.com/lol/match/v5/matches'
 MATCH_HISTORY_API = 'https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid'
 
 # Helper function to make API requests with rate limiting
-def make_request(url, params=None, retries=3, retry_delay=1):
-    """Make a request to the Riot API with rate limiting and retries."""
-    headers = {
-        "X-Riot-Token": KEY
-    }
-    
-    for attempt in range(retries):
-        response = requests.get(url, headers=headers, params=params)
-        
-        if response.status_code == 200:
-            return response.json()
-            
-        elif response.status_code == 429:  # Rate limit exceeded
-            retry_after = int(response.headers.get('Retry-After', retry_delay))
-            logger.warning(f"Rate limit exceeded. Retrying after {retry_after} seconds...")
-            time.sleep(retry_after)
-            
-        elif response.status_code == 404:  # Not found
-            logger.error(f"Resource not found: {url}")
-            return None
-            
-        elif response.status_code == 401:  # Unauthorized
-            logger.error(f"API key invalid or expired")
-            return None
-            
-        else:
-            logger.error(f"API request failed with status code {response.status_code}: {response.text}")
-            
-        if attempt < retries - 1:
-            time.sleep(retry_delay)
-    
-    return None
+def make_request(url, params=None):
+    """Make a request to the Riot API through the shared rate limiter."""
+    return get_sync(url, params=params)
 
 def get_match_ids_for_puuid(puuid, count=20, queue=None, start_time=None, end_time=None):
     """
@@ -137,9 +106,6 @@ def process_player_csv(input_file, output_file, count_per_player=20, queue=None)
             logger.info(f"Processing player {i+1}/{len(puuids)}")
             match_ids = get_match_ids_for_puuid(puuid, count=count_per_player, queue=queue)
             all_match_ids.extend(match_ids)
-            
-            # Add a small delay to avoid rate limiting
-            time.sleep(1)
         
         # Remove duplicates
         unique_match_ids = list(set(all_match_ids))
@@ -1,6 +1,5 @@
 import cassiopeia as cass
 from cassiopeia import Queue
-import requests
 import os
 import sys
 import time
@@ -8,6 +7,7 @@ import logging
 from dotenv import load_dotenv
 
 from backend.fetch_functions import primary_player_fetch as p_fetch
+from backend.fetch_functions.riot_client import get_sync
 
 load_dotenv()
 KEY = os.getenv('API_KEY')
@@ -29,20 +29,13 @@ def summonerId_to_PUUID(summonerId: str):
         if time.time() - cached_data['timestamp'] < 3600:  # Cache valid for 1 hour
             return cached_data['puuid']
 
-    url = f"https://na1.api.riotgames.com/lol/summoner/v4/summoners/{summonerId}?api_key={KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        puuid = response.json()['puuid']
+    data = get_sync(f"https://na1.api.riotgames.com/lol/summoner/v4/summoners/{summonerId}")
+    if data:
+        puuid = data['puuid']
         cache[summonerId] = {'puuid': puuid, 'timestamp': time.time()}  # Store in cache
         return puuid
-    elif response.status_code == 429:
-        retry_after = int(response.headers.get('Retry-After', 1))
-        print(f"Rate limit exceeded. Retrying after {retry_after} seconds...")
-        time.sleep(retry_after)
-        return summonerId_to_PUUID(summonerId)
-    else:
-        print(f"Error fetching PUUID: {response.status_code}")
-        return None
+    print(f"Error fetching PUUID for {summonerId}")
+    return None
 
 def filter_player_id(data: list):
     df = []
@@ -67,60 +60,35 @@ def Higher_Rank_Id_filter(data: dict):
         df.append(entry)
     return df
 
-def get_ranked_entries(region: str, tier: str, division: str, retries=3, delay=5):
-    url = f'https://{region}.api.riotgames.com/lol/league/v4/entries/RANKED_SOLO_5x5/{tier}/{division}?page=1&api_key={KEY}'
-
-    for attempt in range(retries):
-        response = requests.get(url)
-
-        if response.status_code == 200:
-            return response.json()
-
-        elif response.status_code == 429:
-            retry_after = int(response.headers.get('Retry-After', delay))
-            logging.warning(f"[Rate Limited] Retrying in {retry_after} seconds...")
-            time.sleep(retry_after)
-
-        elif response.status_code in [403, 401]:
-            logging.error(f"[Authentication Error {response.status_code}] Check your API key or permissions.")
-            break
-
-        else:
-            logging.error(f"[HTTP {response.status_code}] Failed to fetch data: {response.text}")
-
-        if attempt < retries - 1:
-            logging.info(f"[Retry {attempt+1}/{retries}] Retrying in {delay} seconds...")
-            time.sleep(delay)
-
-    return None
+def get_ranked_entries(region: str, tier: str, division: str):
+    # Rate limits and 429 retries are handled by the shared limiter
+    url = f'https://{region}.api.riotgames.com/lol/league/v4/entries/RANKED_SOLO_5x5/{tier}/{division}'
+    data = get_sync(url, params={"page": 1})
+    if data is None:
+        logging.error(f"Failed to fetch {tier} {division} entries")
+    return data
 
 
 def get_challenger_league():
-    url = f"https://na1.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/RANKED_SOLO_5x5?api_key={KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error when fetching, error code: {response.status_code}")
-        return None
+    url = "https://na1.api.riotgames.com/lol/league/v4/challengerleagues/by-queue/RANKED_SOLO_5x5"
+    data = get_sync(url)
+    if data is None:
+        print("Error when fetching challenger league")
+    return data
 
 def get_grandmaster_league():
-    url = f"https://na1.api.riotgames.com/lol/league/v4/grandmasterleagues/by-queue/RANKED_SOLO_5x5?api_key={KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error when fetching, error code: {response.status_code}")
-        return None
+    url = "https://na1.api.riotgames.com/lol/league/v4/grandmasterleagues/by-queue/RANKED_SOLO_5x5"
+    data = get_sync(url)
+    if data is None:
+        print("Error when fetching grandmaster league")
+    return data
 
 def get_master_league():
-    url = f"https://na1.api.riotgames.com/lol/league/v4/masterleagues/by-queue/RANKED_SOLO_5x5?api_key={KEY}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Error when fetching, error code: {response.status_code}")
-        return None
+    url = "https://na1.api.riotgames.com/lol/league/v4/masterleagues/by-queue/RANKED_SOLO_5x5"
+    data = get_sync(url)
+    if data is None:
+        print("Error when fetching master league")
+    return data
 
 def cass_get_master_league():
     df = []
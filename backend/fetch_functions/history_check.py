@@ -1,10 +1,11 @@
 import os
 import pandas as pd
 import logging
-import requests
-import time
 from dotenv import load_dotenv
 
+from backend.fetch_functions.match_store import MATCH, TIMELINE, match_store
+from backend.fetch_functions.riot_client import get_sync
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -12,46 +13,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Ensure your Riot API key is set
 load_dotenv()
-KEY = os.getenv('API_KEY')
 
 # Define API endpoints
 MATCH_API = 'https://americas.api.riotgames.com/lol/match/v5/matches'
 
 # Helper function to make API requests with rate limiting
-def make_request(url, params=None, retries=3, retry_delay=1):
-    """Make a request to the Riot API with rate limiting and retries."""
-    headers = {
-        "X-Riot-Token": KEY
-    }
-
-    for attempt in range(retries):
-        response = requests.get(url, headers=headers, params=params)
-
-        if response.status_code == 200:
-            return response.json()
-
-        elif response.status_code == 429:  # Rate limit exceeded
-            retry_after = int(response.headers.get('Retry-After', retry_delay))
-            logger.warning(f"Rate limit exceeded. Retrying after {retry_after} seconds...")
-            time.sleep(retry_after)
-
-        elif response.status_code == 404:  # Not found
-            logger.error(f"Resource not found: {url}")
-            return None
-
-        elif response.status_code == 401:  # Unauthorized
-            logger.error(f"API key invalid or expired")
-            return None
-
-        else:
-            logger.error(f"API request failed with status code {response.status_code}: {response.text}")
-
-        if attempt < retries - 1:
-            time.sleep(retry_delay)
-
-    return None
+def make_request(url, params=None):
+    """Make a request to the Riot API through the shared rate limiter."""
+    return get_sync(url, params=params)
 
 def extract_timeline_data(match_id, region=None):
     """
@@ -69,14 +39,14 @@ def extract_timeline_data(match_id, region=None):
 
         # Fetch match data
         match_url = f"{MATCH_API}/{match_id}"
-        match_data = make_request(match_url)
+        match_data = match_store.fetch_sync(match_url, match_id, MATCH)
         if not match_data:
             logger.error(f"Failed to fetch match data for {match_id}")
             return None
 
         # Fetch timeline data
         timeline_url = f"{MATCH_API}/{match_id}/timeline"
-        timeline_data = make_request(timeline_url)
+        timeline_data = match_store.fetch_sync(timeline_url, match_id, TIMELINE)
         if not timeline_data:
             logger.error(f"Failed to fetch timeline data for {match_id}")
             return None
@@ -0,0 +1,190 @@
+"""
+Persistent on-disk cache for immutable Match v5 payloads.
+
+`matches/{id}` and `matches/{id}/timeline` never change once a game has
+ended, so every fetch path checks here before calling Riot. Bodies are kept
+exactly as Riot sent them, gzip-compressed, one file per (match ID, kind):
+
+    <root>/<h[:2]>/<h[2:4]>/<match_id>.<kind>.json.gz    h = sha1(match_id)
+
+The store is capped at MATCH_STORE_MAX_MB. Reads bump a file's mtime, and
+when a write pushes the store over the cap the least recently used files are
+deleted until it is back under 90% of the cap.
+
+Failures to read or write are logged and treated as a miss — the cache must
+never break a fetch. A stored body that fails to decompress or decode is
+deleted and fetched again.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from typing import Any, Callable
+
+from backend.fetch_functions.riot_client import RiotClient, get_bytes_sync
+
+logger = logging.getLogger(__name__)
+
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_DIR       = os.getenv("MATCH_STORE_DIR", os.path.join(_REPO_ROOT, "data", "match_store"))
+DEFAULT_MAX_BYTES = int(os.getenv("MATCH_STORE_MAX_MB", "512")) * 1024 * 1024
+
+MATCH    = "match"
+TIMELINE = "timeline"
+
+
+class MatchStore:
+    def __init__(self, root: str = DEFAULT_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._size: int | None = None     # computed lazily on first write
+        self._lock = threading.Lock()
+
+    def _path(self, match_id: str, kind: str) -> str:
+        h = hashlib.sha1(match_id.encode()).hexdigest()
+        return os.path.join(self.root, h[:2], h[2:4], f"{match_id}.{kind}.json.gz")
+
+    # ------------------------------------------------------------------
+    # Raw access
+    # ------------------------------------------------------------------
+
+    def get(self, match_id: str, kind: str) -> bytes | None:
+        """Return the stored JSON body, or None on a miss."""
+        path = self._path(match_id, kind)
+        try:
+            with open(path, "rb") as f:
+                body = gzip.decompress(f.read())
+            os.utime(path)
+            return body
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, zlib.error) as e:
+            logger.warning("Match store read failed for %s: %s", path, e)
+            self.discard(match_id, kind)
+            return None
+
+    def discard(self, match_id: str, kind: str):
+        """Delete a stored body, e.g. one that turned out to be corrupt."""
+        try:
+            os.remove(self._path(match_id, kind))
+        except OSError:
+            pass
+
+    def put(self, match_id: str, kind: str, body: bytes):
+        """Store a JSON body. Writes are atomic, so concurrent readers never see partial files."""
+        path = self._path(match_id, kind)
+        data = gzip.compress(body, compresslevel=6)
+        tmp = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            # The temp file isn't counted towards the cap, so eviction would never remove it
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            logger.warning("Match store write failed for %s: %s", path, e)
+            return
+        self._account(len(data))
+
+    # ------------------------------------------------------------------
+    # Size cap / LRU eviction
+    # ------------------------------------------------------------------
+
+    def _files(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, path) for every stored file."""
+        out = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                out.append((st.st_mtime, st.st_size, path))
+        return out
+
+    def _account(self, added: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            else:
+                self._size += added
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        target = int(self.max_bytes * 0.9)
+        files = sorted(self._files())
+        size = sum(s for _, s, _ in files)
+        for _, s, path in files:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= s
+            except OSError:
+                pass
+        self._size = size
+
+    # ------------------------------------------------------------------
+    # Fetch-through helpers
+    # ------------------------------------------------------------------
+
+    async def fetch(
+        self,
+        riot: RiotClient,
+        url: str,
+        match_id: str,
+        kind: str,
+        loads: Callable[[bytes], Any] = json.loads,
+    ) -> dict | None:
+        """Return the payload from the store, fetching and storing it on a miss.
+        `loads` decodes the stored body, e.g. timeline_fetch.load_timeline."""
+        body = await asyncio.to_thread(self.get, match_id, kind)
+        if body is not None:
+            try:
+                return loads(body)
+            except ValueError as e:
+                logger.warning("Match store body for %s %s is corrupt: %s", match_id, kind, e)
+                await asyncio.to_thread(self.discard, match_id, kind)
+        body = await riot.get_bytes(url)
+        if body is None:
+            return None
+        await asyncio.to_thread(self.put, match_id, kind, body)
+        return loads(body)
+
+    def fetch_sync(
+        self,
+        url: str,
+        match_id: str,
+        kind: str,
+        loads: Callable[[bytes], Any] = json.loads,
+    ) -> dict | None:
+        """Blocking counterpart of fetch() for the requests-based scripts."""
+        body = self.get(match_id, kind)
+        if body is not None:
+            try:
+                return loads(body)
+            except ValueError as e:
+                logger.warning("Match store body for %s %s is corrupt: %s", match_id, kind, e)
+                self.discard(match_id, kind)
+        body = get_bytes_sync(url)
+        if body is None:
+            return None
+        self.put(match_id, kind, body)
+        return loads(body)
+
+
+match_store = MatchStore()
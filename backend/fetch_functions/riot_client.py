@@ -0,0 +1,421 @@
+"""
+Shared Riot API client with header-aware rate limiting.
+
+Every request is scheduled against the key's rate limits *before* it is sent,
+so steady-state traffic never sees a 429. Limits are learned from the
+X-App-Rate-Limit / X-Method-Rate-Limit headers (and their -Count siblings)
+and tracked the way Riot enforces them:
+
+  - application limits per routing value (na1, americas, asia, ...)
+  - method limits per routing value + endpoint (match-v5.match, ...)
+
+RiotClient is the async client used by the scanner and pipeline.py.
+get_sync() is the blocking equivalent for the requests-based scripts in
+backend/fetch_functions. Both share one RateLimiter per process.
+
+Requests carry a priority class. INTERACTIVE (user-facing scans) always goes
+first; BATCH (match/timeline ingestion) yields to queued interactive requests
+on the same routing value and only ever fills each window up to
+(1 - RIOT_INTERACTIVE_RESERVE) of the limit. Because window counts are synced
+from Riot's headers, that reserve also holds when the API and the pipeline run
+in different processes on the same key.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from dotenv import load_dotenv
+
+from backend.metrics import RIOT_RATE_LIMITED, RIOT_REQUEST_SECONDS, RIOT_RETRY_AFTER_SECONDS
+
+load_dotenv()
+KEY = os.getenv("API_KEY")
+
+logger = logging.getLogger(__name__)
+
+# Development-key limits (20 req/s, 100 req/2 min). Used for a routing value
+# until its first response tells us the real limits for the key.
+DEFAULT_APP_LIMITS = os.getenv("RIOT_APP_RATE_LIMIT", "20:1,100:120")
+
+# Riot starts a window when it *receives* the first request; pad ours so
+# latency can't make us think the next window has started before Riot does.
+_WINDOW_PADDING = 0.25
+
+INTERACTIVE = "interactive"
+BATCH       = "batch"
+PRIORITIES  = (INTERACTIVE, BATCH)
+
+# Fraction of every window that batch traffic leaves free for interactive scans
+_INTERACTIVE_RESERVE = float(os.getenv("RIOT_INTERACTIVE_RESERVE", "0.2"))
+
+# How long a batch request backs off while interactive requests are queued
+_BATCH_YIELD = 0.05
+
+_METHODS = (
+    ("account-v1.by-riot-id",          re.compile(r"^/riot/account/v1/accounts/by-riot-id/")),
+    ("account-v1.by-puuid",            re.compile(r"^/riot/account/v1/accounts/by-puuid/")),
+    ("summoner-v4.by-puuid",           re.compile(r"^/lol/summoner/v4/summoners/by-puuid/")),
+    ("summoner-v4.by-id",              re.compile(r"^/lol/summoner/v4/summoners/[^/]+$")),
+    ("league-v4.entries-by-puuid",     re.compile(r"^/lol/league/v4/entries/by-puuid/")),
+    ("league-v4.entries",              re.compile(r"^/lol/league/v4/entries/")),
+    ("league-v4.challengerleagues",    re.compile(r"^/lol/league/v4/challengerleagues/")),
+    ("league-v4.grandmasterleagues",   re.compile(r"^/lol/league/v4/grandmasterleagues/")),
+    ("league-v4.masterleagues",        re.compile(r"^/lol/league/v4/masterleagues/")),
+    ("match-v5.ids-by-puuid",          re.compile(r"^/lol/match/v5/matches/by-puuid/[^/]+/ids$")),
+    ("match-v5.timeline",              re.compile(r"^/lol/match/v5/matches/[^/]+/timeline$")),
+    ("match-v5.match",                 re.compile(r"^/lol/match/v5/matches/[^/]+$")),
+)
+
+
+def route_of(url: str) -> tuple[str, str]:
+    """Return (routing value, method key) for a Riot API URL."""
+    parts = urlsplit(url)
+    routing = parts.hostname.split(".", 1)[0] if parts.hostname else ""
+    for method, pattern in _METHODS:
+        if pattern.match(parts.path):
+            return routing, method
+    # Unknown endpoint — group by its first four path segments
+    return routing, "/".join(parts.path.split("/")[:5])
+
+
+def _parse_pairs(header: str | None) -> list[tuple[int, int]]:
+    """Parse '20:1,100:120' into [(20, 1), (100, 120)]."""
+    pairs = []
+    for part in (header or "").split(","):
+        value, _, seconds = part.strip().partition(":")
+        if value.isdigit() and seconds.isdigit():
+            pairs.append((int(value), int(seconds)))
+    return pairs
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting
+# ---------------------------------------------------------------------------
+
+class _Window:
+    """One `limit:seconds` bucket. Tokens refill in full when the window
+    elapses, which is how Riot counts, so a bucket that says "go" never 429s."""
+
+    __slots__ = ("limit", "seconds", "count", "reset_at")
+
+    def __init__(self, limit: int, seconds: int):
+        self.limit = limit
+        self.seconds = seconds
+        self.count = 0
+        self.reset_at = 0.0
+
+    def _roll(self, now: float):
+        if now >= self.reset_at:
+            self.count = 0
+            self.reset_at = now + self.seconds + _WINDOW_PADDING
+
+    def delay(self, now: float, share: float = 1.0) -> float:
+        if now >= self.reset_at or self.count < max(1, int(self.limit * share)):
+            return 0.0
+        return self.reset_at - now
+
+    def take(self, now: float):
+        self._roll(now)
+        self.count += 1
+
+    def sync(self, count: int, now: float):
+        """Reconcile with Riot's count, which includes other processes on the key."""
+        self._roll(now)
+        self.count = max(self.count, count)
+
+
+class _Bucket:
+    """All windows for one scope (an app limit or a method limit)."""
+
+    __slots__ = ("windows", "blocked_until")
+
+    def __init__(self, spec: str | None = None):
+        self.windows: dict[int, _Window] = {}
+        self.blocked_until = 0.0
+        if spec:
+            self.configure(_parse_pairs(spec))
+
+    def configure(self, pairs: list[tuple[int, int]]):
+        """Apply limits from a header, keeping counts for windows we already track."""
+        if not pairs or {s: l for l, s in pairs} == {s: w.limit for s, w in self.windows.items()}:
+            return
+        windows = {}
+        for limit, seconds in pairs:
+            w = self.windows.get(seconds) or _Window(limit, seconds)
+            w.limit = limit
+            windows[seconds] = w
+        self.windows = windows
+
+    def delay(self, now: float, share: float = 1.0) -> float:
+        wait = self.blocked_until - now
+        for w in self.windows.values():
+            wait = max(wait, w.delay(now, share))
+        return max(wait, 0.0)
+
+    def take(self, now: float):
+        for w in self.windows.values():
+            w.take(now)
+
+    def sync(self, counts: list[tuple[int, int]], now: float):
+        for count, seconds in counts:
+            w = self.windows.get(seconds)
+            if w:
+                w.sync(count, now)
+
+
+class RateLimiter:
+    """
+    Tracks app and method limits for every routing value seen by this process.
+    Thread-safe so the async client and the blocking scripts can share it.
+    """
+
+    def __init__(self, app_limits: str = DEFAULT_APP_LIMITS):
+        self._default_app = app_limits
+        self._lock = threading.Lock()
+        self._app: dict[str, _Bucket] = {}
+        self._method: dict[tuple[str, str], _Bucket] = {}
+        # routing value -> requests currently waiting, per priority class
+        self._queued: dict[str, dict[str, int]] = {p: defaultdict(int) for p in PRIORITIES}
+        self._stats = {
+            p: {"requests": 0, "delayed": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+            for p in PRIORITIES
+        }
+
+    def _buckets(self, routing: str, method: str) -> tuple[_Bucket, _Bucket]:
+        app = self._app.get(routing)
+        if app is None:
+            app = self._app[routing] = _Bucket(self._default_app)
+        meth = self._method.get((routing, method))
+        if meth is None:
+            meth = self._method[(routing, method)] = _Bucket()
+        return app, meth
+
+    def reserve(self, routing: str, method: str, priority: str = INTERACTIVE) -> float:
+        """Take a slot and return 0 if the request may go now, else return seconds to wait."""
+        with self._lock:
+            app, meth = self._buckets(routing, method)
+            now = time.monotonic()
+            share = 1.0 if priority == INTERACTIVE else 1.0 - _INTERACTIVE_RESERVE
+            wait = max(app.delay(now, share), meth.delay(now, share))
+            if priority == BATCH and self._queued[INTERACTIVE][routing]:
+                wait = max(wait, _BATCH_YIELD)
+            if wait <= 0:
+                app.take(now)
+                meth.take(now)
+            return wait
+
+    def enqueue(self, routing: str, priority: str):
+        with self._lock:
+            self._queued[priority][routing] += 1
+
+    def dequeue(self, routing: str, priority: str):
+        with self._lock:
+            self._queued[priority][routing] -= 1
+
+    def record(self, priority: str, waited: float):
+        """Account one request that was released after waiting `waited` seconds."""
+        with self._lock:
+            s = self._stats[priority]
+            s["requests"] += 1
+            if waited > 0:
+                s["delayed"] += 1
+                s["wait_seconds"] += waited
+                s["max_wait_seconds"] = max(s["max_wait_seconds"], waited)
+
+    def stats(self) -> dict:
+        """Queue depth and wait time per priority class."""
+        with self._lock:
+            out = {}
+            for p in PRIORITIES:
+                s = self._stats[p]
+                out[p] = {
+                    "queued":           sum(self._queued[p].values()),
+                    "requests":         s["requests"],
+                    "delayed":          s["delayed"],
+                    "avg_wait_ms":      round(1000 * s["wait_seconds"] / s["requests"], 1) if s["requests"] else 0.0,
+                    "max_wait_ms":      round(1000 * s["max_wait_seconds"], 1),
+                }
+            return out
+
+    def update(self, routing: str, method: str, headers):
+        """Learn limits and current counts from a response's rate-limit headers."""
+        with self._lock:
+            app, meth = self._buckets(routing, method)
+            now = time.monotonic()
+            app.configure(_parse_pairs(headers.get("X-App-Rate-Limit")))
+            app.sync(_parse_pairs(headers.get("X-App-Rate-Limit-Count")), now)
+            meth.configure(_parse_pairs(headers.get("X-Method-Rate-Limit")))
+            meth.sync(_parse_pairs(headers.get("X-Method-Rate-Limit-Count")), now)
+
+    def penalize(self, routing: str, method: str, headers) -> int:
+        """Block the offending scope after a 429 and return the Retry-After seconds."""
+        wait = int(headers.get("Retry-After", 1))
+        with self._lock:
+            app, meth = self._buckets(routing, method)
+            bucket = app if headers.get("X-Rate-Limit-Type") == "application" else meth
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + wait)
+        return wait
+
+
+_limiter = RateLimiter()
+
+
+def _count_429(method: str, headers, wait: int):
+    # No X-Rate-Limit-Type means the service itself was overloaded
+    RIOT_RATE_LIMITED.labels(method, headers.get("X-Rate-Limit-Type", "service")).inc()
+    RIOT_RETRY_AFTER_SECONDS.labels(method).inc(wait)
+
+
+def scheduler_stats() -> dict:
+    """Per-priority queue depth and wait times for this process's Riot traffic."""
+    return _limiter.stats()
+
+
+# ---------------------------------------------------------------------------
+# Async client
+# ---------------------------------------------------------------------------
+
+class RiotClient:
+    """
+    Async Riot API client. Pass an existing aiohttp session to share its
+    connection pool, or use as `async with RiotClient() as riot:` to own one.
+    All clients in a process share the same rate limiter by default.
+    `priority` is the scheduling class for every request made through this client.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        *,
+        api_key: str | None = None,
+        limiter: RateLimiter | None = None,
+        max_concurrency: int | None = None,
+        priority: str = INTERACTIVE,
+    ):
+        self.priority = priority
+        self._session = session
+        self._owns_session = session is None
+        self._headers = {"X-Riot-Token": api_key or KEY}
+        self._limiter = limiter or _limiter
+        self._sem = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+    async def __aenter__(self) -> "RiotClient":
+        if self._session is None:
+            self._session = aiohttp.ClientSession()
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Underlying HTTP session, for non-Riot requests such as DDragon."""
+        return self._session
+
+    async def get(self, url: str) -> dict | list | None:
+        """GET a Riot API URL. Returns the decoded JSON body, or None on a non-200 response."""
+        body = await self.get_bytes(url)
+        return json.loads(body) if body is not None else None
+
+    async def get_bytes(self, url: str) -> bytes | None:
+        """Like get(), but returns the undecoded response body."""
+        if self._sem is None:
+            return await self._get(url)
+        async with self._sem:
+            return await self._get(url)
+
+    async def _acquire(self, routing: str, method: str):
+        limiter, priority = self._limiter, self.priority
+        wait = limiter.reserve(routing, method, priority)
+        if wait <= 0:
+            limiter.record(priority, 0.0)
+            return
+        start = time.monotonic()
+        limiter.enqueue(routing, priority)
+        try:
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = limiter.reserve(routing, method, priority)
+        finally:
+            limiter.dequeue(routing, priority)
+        limiter.record(priority, time.monotonic() - start)
+
+    async def _get(self, url: str) -> bytes | None:
+        routing, method = route_of(url)
+        while True:
+            await self._acquire(routing, method)
+            started = time.perf_counter()
+            async with self._session.get(url, headers=self._headers) as r:
+                self._limiter.update(routing, method, r.headers)
+                if r.status == 200:
+                    body = await r.read()
+                    RIOT_REQUEST_SECONDS.labels(method, "200").observe(time.perf_counter() - started)
+                    return body
+                RIOT_REQUEST_SECONDS.labels(method, str(r.status)).observe(time.perf_counter() - started)
+                if r.status == 429:
+                    wait = self._limiter.penalize(routing, method, r.headers)
+                    _count_429(method, r.headers, wait)
+                    logger.warning("Rate limited on %s %s — waiting %ss", routing, method, wait)
+                    continue
+                logger.warning("HTTP %s: %s", r.status, url)
+                return None
+
+
+# ---------------------------------------------------------------------------
+# Blocking client
+# ---------------------------------------------------------------------------
+
+_http = requests.Session()
+
+
+def get_sync(url: str, params: dict | None = None) -> dict | list | None:
+    """Blocking GET through the shared rate limiter, for the requests-based scripts."""
+    body = get_bytes_sync(url, params)
+    return json.loads(body) if body is not None else None
+
+
+def _acquire_sync(routing: str, method: str):
+    # The blocking scripts are all bulk ingestion, so they run as BATCH
+    wait = _limiter.reserve(routing, method, BATCH)
+    if wait <= 0:
+        _limiter.record(BATCH, 0.0)
+        return
+    start = time.monotonic()
+    _limiter.enqueue(routing, BATCH)
+    try:
+        while wait > 0:
+            time.sleep(wait)
+            wait = _limiter.reserve(routing, method, BATCH)
+    finally:
+        _limiter.dequeue(routing, BATCH)
+    _limiter.record(BATCH, time.monotonic() - start)
+
+
+def get_bytes_sync(url: str, params: dict | None = None) -> bytes | None:
+    """Like get_sync(), but returns the undecoded response body."""
+    routing, method = route_of(url)
+    while True:
+        _acquire_sync(routing, method)
+        started = time.perf_counter()
+        r = _http.get(url, headers={"X-Riot-Token": KEY}, params=params)
+        RIOT_REQUEST_SECONDS.labels(method, str(r.status_code)).observe(time.perf_counter() - started)
+        _limiter.update(routing, method, r.headers)
+        if r.status_code == 200:
+            return r.content
+        if r.status_code == 429:
+            wait = _limiter.penalize(routing, method, r.headers)
+            _count_429(method, r.headers, wait)
+            logger.warning("Rate limited on %s %s — waiting %ss", routing, method, wait)
+            continue
+        logger.warning("HTTP %s: %s", r.status_code, url)
+        return None
@@ -1,10 +1,7 @@
-import os
-import time
-import requests
-from dotenv import load_dotenv
+import json
 
-load_dotenv()
-KEY = os.getenv("API_KEY")
+from backend.fetch_functions.match_store import TIMELINE, match_store
+from backend.metrics import cpu_timed
 
 PLATFORM_TO_CONTINENT = {
     "na1": "americas", "br1": "americas", "la1": "americas", "la2": "americas",
@@ -15,30 +12,56 @@ PLATFORM_TO_CONTINENT = {
 
 SNAPSHOT_MINUTES = {5, 10, 15, 20, 25, 30}
 
+# Everything extract_snapshots reads from a timeline. load_timeline drops the rest.
+_FRAME_FIELDS = frozenset({"timestamp", "participantFrames", "events"})
+_PARTICIPANT_FRAME_FIELDS = frozenset({"participantId", "minionsKilled", "totalGold", "xp", "level"})
+_EVENT_TYPES = frozenset({"CHAMPION_KILL", "ITEM_PURCHASED", "ITEM_SOLD", "ITEM_DESTROYED", "ITEM_UNDO"})
+_EVENT_FIELDS = frozenset({
+    "type", "timestamp", "participantId", "itemId", "beforeId", "afterId",
+    "killerId", "victimId", "assistingParticipantIds",
+})
+
+
+def _prune(pairs: list[tuple[str, object]]) -> dict | None:
+    """
+    object_pairs_hook for timeline JSON. Called for every object as soon as it
+    is parsed (innermost first), so unused fields and event types are dropped
+    before their parent exists and the full tree is never built.
+    """
+    obj = dict(pairs)
+    if "type" in obj and "timestamp" in obj:                  # event
+        if obj["type"] not in _EVENT_TYPES:
+            return None
+        return {k: v for k, v in pairs if k in _EVENT_FIELDS}
+    if "participantFrames" in obj:                            # frame
+        frame = {k: v for k, v in pairs if k in _FRAME_FIELDS}
+        frame["events"] = [e for e in frame.get("events", []) if e is not None]
+        return frame
+    if "totalGold" in obj and "participantId" in obj:         # participant frame
+        return {k: v for k, v in pairs if k in _PARTICIPANT_FRAME_FIELDS}
+    return obj
+
+
+def load_timeline(body: bytes) -> dict:
+    """
+    Decode a Match v5 timeline body keeping only what extract_snapshots needs:
+    frame timestamps, per-participant cs/gold/xp/level, and kill/item events.
+    The result is a small fraction of the size of json.loads on the same body.
+    """
+    return json.loads(body, object_pairs_hook=_prune)
 
-def _get(url: str) -> dict | None:
-    """GET with automatic rate-limit retry."""
-    headers = {"X-Riot-Token": KEY}
-    while True:
-        r = requests.get(url, headers=headers)
-        if r.status_code == 200:
-            return r.json()
-        if r.status_code == 429:
-            wait = int(r.headers.get("Retry-After", 1))
-            print(f"Rate limited. Waiting {wait}s...")
-            time.sleep(wait)
-            continue
-        print(f"HTTP {r.status_code} fetching timeline for {url}")
-        return None
+
+def _timeline_url(match_id: str, platform: str) -> str:
+    continent = PLATFORM_TO_CONTINENT.get(platform.lower(), "americas")
+    return f"https://{continent}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline"
 
 
 def fetch_timeline(match_id: str, platform: str) -> dict | None:
     """Fetch the raw match timeline from the Riot Match v5 API."""
-    continent = PLATFORM_TO_CONTINENT.get(platform.lower(), "americas")
-    url = f"https://{continent}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline"
-    return _get(url)
+    return match_store.fetch_sync(_timeline_url(match_id, platform), match_id, TIMELINE)
 
 
+@cpu_timed("extract_snapshots")
 def extract_snapshots(
     timeline: dict,
     match_id: str,
@@ -0,0 +1,126 @@
+"""
+Prometheus metrics for the API's hot paths, served on /metrics.
+
+prometheus_client is only in requirements-api.txt. Without it (pipeline
+runs, local scripts) every metric here is a no-op, so instrumented code
+never has to check.
+
+Histograms use a handful of fixed buckets and low-cardinality labels
+(Riot method key, status code, cache name) so observing is a few hundred
+nanoseconds and safe to leave on in production.
+"""
+import functools
+import time
+from typing import Any, Callable
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:         # optional — metrics become no-ops
+    REGISTRY = None
+
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_CPU_BUCKETS     = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+_LAG_BUCKETS     = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class _Noop:
+    def labels(self, *args, **kwargs) -> "_Noop":
+        return self
+
+    def observe(self, value: float):
+        pass
+
+    def inc(self, amount: float = 1):
+        pass
+
+
+if REGISTRY is not None:
+    RIOT_REQUEST_SECONDS = Histogram(
+        "heimer_riot_request_seconds", "Riot API request latency",
+        ["method", "status"], buckets=_LATENCY_BUCKETS,
+    )
+    RIOT_RATE_LIMITED = Counter(
+        "heimer_riot_rate_limited", "Riot API 429 responses",
+        ["method", "limit_type"],
+    )
+    RIOT_RETRY_AFTER_SECONDS = Counter(
+        "heimer_riot_retry_after_seconds", "Seconds blocked by Retry-After after a 429",
+        ["method"],
+    )
+    BENCHMARK_QUERY_SECONDS = Histogram(
+        "heimer_benchmark_query_seconds", "get_benchmark database query time",
+        buckets=_LATENCY_BUCKETS,
+    )
+    CPU_SECONDS = Histogram(
+        "heimer_cpu_seconds", "CPU time per call of hot parsing functions",
+        ["function"], buckets=_CPU_BUCKETS,
+    )
+    EVENT_LOOP_LAG_SECONDS = Histogram(
+        "heimer_event_loop_lag_seconds", "How late the event loop woke a periodic sleeper",
+        buckets=_LAG_BUCKETS,
+    )
+else:
+    RIOT_REQUEST_SECONDS = RIOT_RATE_LIMITED = RIOT_RETRY_AFTER_SECONDS = _Noop()
+    BENCHMARK_QUERY_SECONDS = CPU_SECONDS = EVENT_LOOP_LAG_SECONDS = _Noop()
+
+
+def cpu_timed(name: str) -> Callable:
+    """Decorator: record the calling thread's CPU time for each call as
+    heimer_cpu_seconds{function=name}."""
+    def decorate(fn: Callable) -> Callable:
+        if REGISTRY is None:
+            return fn
+        hist = CPU_SECONDS.labels(name)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.thread_time() - start)
+        return wrapper
+    return decorate
+
+
+# ---------------------------------------------------------------------------
+# Caches — read at scrape time from their own counters
+# ---------------------------------------------------------------------------
+
+_caches: dict[str, Any] = {}
+
+
+def register_cache(name: str, cache: Any):
+    """Export a cache's stats() (hits, misses, evictions, entries, ...) under `name`."""
+    _caches[name] = cache
+
+
+class _CacheCollector:
+    def collect(self):
+        counters = {
+            field: CounterMetricFamily(f"heimer_cache_{field}", f"Cache {field}", labels=["cache"])
+            for field in ("hits", "misses", "evictions", "expirations")
+        }
+        gauges = {
+            field: GaugeMetricFamily(f"heimer_cache_{field}", f"Cache {field.replace('_', ' ')}", labels=["cache"])
+            for field in ("entries", "bytes", "hit_ratio")
+        }
+        for name, cache in _caches.items():
+            stats = cache.stats()
+            for field, family in (*counters.items(), *gauges.items()):
+                if stats.get(field) is not None:
+                    family.add_metric([name], stats[field])
+        yield from counters.values()
+        yield from gauges.values()
+
+
+if REGISTRY is not None:
+    REGISTRY.register(_CacheCollector())
+
+
+def render() -> tuple[bytes, str] | None:
+    """(body, content type) for a /metrics response, or None without prometheus_client."""
+    if REGISTRY is None:
+        return None
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,82 @@
+"""
+Microbenchmark: scan cache hit latency.
+
+  dict    — plain {key: (scan, expires_at)} lookup, the original api/main.py cache
+  lru     — player_scanner.cache.LRUCache (per-process, byte-budgeted)
+  sqlite  — player_scanner.shared_cache.SQLiteCache (WAL, shared across workers)
+
+Each cached value is a full /player-sized scan (profile + 100 matches +
+champion pool) including the pre-rendered JSON/gzip body that api/main.py
+stores with it. The SQLite run also reads the cache from a second process
+to confirm a scan written by one worker is a hit in another.
+
+Usage:
+    python benchmarks/scan_cache_bench.py
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")  # never connected
+
+from api.main import _render_player
+from player_scanner.cache import LRUCache
+from player_scanner.shared_cache import SQLiteCache
+from serialize_bench import build_player_payload
+
+KEY = "thekun#wang@na1"
+TTL = 300
+
+
+def _read_in_other_process(path: str, queue):
+    cache = SQLiteCache(path, ttl=TTL)
+    data = cache.get(KEY)
+    queue.put(None if data is None else len(data["recent_matches"]))
+    cache.close()
+
+
+def per_hit_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    scan = build_player_payload()
+    # Scans also carry the full match ID list that /matches pages through
+    scan["match_ids"] = [m.match_id for m in scan["recent_matches"]]
+    _render_player(scan)
+
+    plain = {KEY: (scan, datetime.now(tz=timezone.utc) + timedelta(seconds=TTL))}
+
+    def dict_hit():
+        data, expires = plain[KEY]
+        assert datetime.now(tz=timezone.utc) < expires
+        return data
+
+    lru = LRUCache(max_entries=10_000, ttl=TTL)
+    lru.set(KEY, scan)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scans.sqlite")
+        shared = SQLiteCache(path, ttl=TTL)
+        shared.set(KEY, scan)
+
+        queue = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=_read_in_other_process, args=(path, queue))
+        proc.start()
+        seen = queue.get(timeout=30)
+        proc.join()
+        assert seen == 100, f"second process saw {seen!r}"
+
+        print("Scan cache hit latency (best of 5):")
+        print(f"  dict    {per_hit_us(dict_hit, 100_000):9.2f} µs")
+        print(f"  lru     {per_hit_us(lambda: lru.get(KEY), 100_000):9.2f} µs")
+        print(f"  sqlite  {per_hit_us(lambda: shared.get(KEY), 2_000):9.2f} µs   (cross-process hit verified)")
+        shared.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Microbenchmark: API response serialization, old path vs new path.
+
+  old — dataclasses.asdict + jsonable_encoder per object, then FastAPI's
+        jsonable_encoder pass over the whole result and JSONResponse
+  new — ORJSONResponse over the dataclasses directly (api.main._json)
+
+Uses a /player-sized payload (profile + 100 matches + champion pool) and a
+/timeline-sized one (40 per-minute snapshots), and checks both paths produce
+identical JSON before timing them.
+
+Usage:
+    python benchmarks/serialize_bench.py
+"""
+import dataclasses
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")  # never connected
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from player_scanner import ChampionStats, MatchSummary, PerMinuteSnapshot, PlayerProfile
+
+CHAMPIONS = ["Aatrox", "Ahri", "Jinx", "LeeSin", "Thresh", "Orianna", "Darius", "KSante"]
+ROLES = ["TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY"]
+
+
+def build_player_payload() -> dict:
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    matches = [
+        MatchSummary(
+            match_id=f"NA1_{5_000_000_000 + i}",
+            champion=CHAMPIONS[i % len(CHAMPIONS)],
+            role=ROLES[i % len(ROLES)],
+            kills=i % 12, deaths=i % 7, assists=i % 15,
+            cs=150 + i, gold=9000 + 37 * i, damage=15000 + 113 * i, vision_score=20 + i % 30,
+            win=i % 2 == 0,
+            duration=1500 + 7 * i,
+            game_timestamp=start + timedelta(hours=i, milliseconds=123 * i),
+            items=[3006, 3071, 3053, 6333, 3065, 3742, 3364][: 1 + i % 7],
+            patch="15.1",
+        )
+        for i in range(100)
+    ]
+    pool = [
+        ChampionStats(champion=c, games=12, wins=7, winrate=7 / 12, avg_kills=5.5, avg_deaths=4.25, avg_assists=6.1)
+        for c in CHAMPIONS
+    ]
+    profile = PlayerProfile(
+        puuid="x" * 78, game_name="Thekun", tag_line="Wang", summoner_level=412,
+        profile_icon_url="https://ddragon.leagueoflegends.com/cdn/15.1.1/img/profileicon/1.png",
+        rank="PLATINUM II", lp=54, wins=120, losses=110, winrate=120 / 230,
+    )
+    return {"profile": profile, "recent_matches": matches, "champion_pool": pool}
+
+
+def build_timeline_payload() -> list:
+    return [
+        PerMinuteSnapshot(
+            timestamp_minute=t,
+            player_cs=7.1 * t, player_gold=400.0 * t, player_xp=500.0 * t, player_level=1 + t / 2,
+            player_kills=t / 10, player_deaths=t / 12, player_assists=t / 8,
+            benchmark_cs=8.2 * t if t % 5 == 0 else None,
+            benchmark_gold=450.0 * t if t % 5 == 0 else None,
+            benchmark_xp=520.0 * t if t % 5 == 0 else None,
+            benchmark_level=1.1 + t / 2 if t % 5 == 0 else None,
+            benchmark_kills=t / 9 if t % 5 == 0 else None,
+            benchmark_deaths=t / 14 if t % 5 == 0 else None,
+            benchmark_assists=t / 7 if t % 5 == 0 else None,
+        )
+        for t in range(1, 41)
+    ]
+
+
+def _old_serialize(obj) -> dict:
+    return jsonable_encoder(dataclasses.asdict(obj))
+
+
+def old_player(data: dict) -> bytes:
+    content = {
+        "profile":        _old_serialize(data["profile"]),
+        "recent_matches": [_old_serialize(m) for m in data["recent_matches"]],
+        "champion_pool":  [_old_serialize(c) for c in data["champion_pool"]],
+    }
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def new_player(data: dict) -> bytes:
+    return ORJSONResponse({
+        "profile":        data["profile"],
+        "recent_matches": data["recent_matches"],
+        "champion_pool":  data["champion_pool"],
+    }).body
+
+
+def old_timeline(snapshots: list) -> bytes:
+    return JSONResponse(jsonable_encoder([_old_serialize(s) for s in snapshots])).body
+
+
+def new_timeline(snapshots: list) -> bytes:
+    return ORJSONResponse(snapshots).body
+
+
+def bench(label: str, old, new, arg, number: int):
+    assert json.loads(old(arg)) == json.loads(new(arg)), f"{label}: JSON output differs"
+    t_old = min(timeit.repeat(lambda: old(arg), number=number, repeat=5)) / number
+    t_new = min(timeit.repeat(lambda: new(arg), number=number, repeat=5)) / number
+    print(f"  {label:<10} old {t_old * 1e6:9.1f} µs   new {t_new * 1e6:8.1f} µs   {t_old / t_new:5.1f}x")
+
+
+def main():
+    print("Serialization per response (best of 5):")
+    bench("/player", old_player, new_player, build_player_payload(), number=200)
+    bench("/timeline", old_timeline, new_timeline, build_timeline_payload(), number=500)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
@@ -15,7 +16,8 @@ engine = create_async_engine(
     pool_size=5,
     max_overflow=10,
     pool_pre_ping=True,       # re-validate connections after Neon auto-suspends
-    connect_args={"ssl": True},
+    # DATABASE_SSL=0 for a local Postgres without TLS (e.g. test_benchmark_schema.py)
+    connect_args={"ssl": os.getenv("DATABASE_SSL", "1") != "0"},
 )
 _Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -31,13 +33,52 @@ async def get_session():
             raise
 
 
-async def clear_all_tables(session: AsyncSession):
-    """Truncate match data at the start of each run so data stays current.
-    item_catalog is intentionally excluded — patch item data never changes.
+async def warm_pool(connections: int = 5):
+    """Open `connections` pooled connections up front so the first requests
+    after a deploy (or a Neon auto-suspend) don't pay for TLS + auth."""
+    async def _ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.gather(*[_ping() for _ in range(connections)])
+
+
+def _patch_order(patch: str) -> tuple:
+    return tuple(int(part) if part.isdigit() else -1 for part in patch.split("."))
+
+
+async def get_stored_patches(session: AsyncSession) -> list[str]:
+    """Patches with stored matches, newest first."""
+    result = await session.execute(text("SELECT DISTINCT patch FROM matches WHERE patch <> ''"))
+    return sorted((row[0] for row in result.fetchall()), key=_patch_order, reverse=True)
+
+
+async def get_stored_match_ids(session: AsyncSession) -> set[str]:
+    """IDs of every match already stored — the pipeline skips these."""
+    result = await session.execute(text("SELECT match_id FROM matches"))
+    return {row[0] for row in result.fetchall()}
+
+
+async def ensure_patch_partitions(session: AsyncSession, patch: str):
+    """Create the matches / participants / timeline_snapshots partitions for
+    `patch` (see db/migrations/0003_partition_by_patch.sql)."""
+    await session.execute(text("SELECT ensure_patch_partitions(:patch)"), {"patch": patch})
+
+
+async def drop_old_patches(session: AsyncSession, keep: int) -> list[str]:
+    """Drop the partitions, rollup and sketch rows of every patch except the
+    `keep` newest, then players no longer in any match. Returns the dropped
+    patches. Dropping a partition is constant time whatever its size.
     """
-    await session.execute(text(
-        "TRUNCATE timeline_snapshots, participants, matches, players RESTART IDENTITY CASCADE"
-    ))
+    dropped = (await get_stored_patches(session))[keep:]
+    for patch in dropped:
+        await session.execute(text("SELECT drop_patch_partitions(:patch)"), {"patch": patch})
+    if dropped:
+        await session.execute(text("""
+            DELETE FROM players pl
+            WHERE pl.rank = 'UNKNOWN'
+              AND NOT EXISTS (SELECT 1 FROM participants p WHERE p.puuid = pl.puuid)
+        """))
+    return dropped
 
 
 async def get_known_patches(session: AsyncSession) -> set[str]:
@@ -98,13 +139,34 @@ async def upsert_players(session: AsyncSession, players: list[dict]):
     )
 
 
+# Module-level so test_benchmark_schema.py can EXPLAIN it. The rank list (not
+# rank <> 'UNKNOWN') uses the players_rank index, and the anti-join hashes the
+# roster instead of comparing every ranked player against every roster entry.
+_DEMOTE_UNLISTED = text("""
+    UPDATE players pl SET rank = 'UNKNOWN', lp = NULL
+    WHERE pl.rank IN ('CHALLENGER', 'GRANDMASTER', 'MASTER')
+      AND NOT EXISTS (
+          SELECT 1 FROM unnest(CAST(:puuids AS TEXT[])) AS r(puuid) WHERE r.puuid = pl.puuid
+      )
+""")
+
+
+async def demote_unlisted_players(session: AsyncSession, puuids: list[str]) -> int:
+    """Reset rank/lp to UNKNOWN for every ranked player not in `puuids` (this
+    run's league rosters), so a player who fell out of Master+ stops counting
+    towards its benchmarks. Returns the number of players demoted.
+    """
+    result = await session.execute(_DEMOTE_UNLISTED, {"puuids": puuids})
+    return result.rowcount
+
+
 async def upsert_match(session: AsyncSession, match: dict):
     """Insert a match row, skipping if already stored."""
     await session.execute(
         text("""
             INSERT INTO matches (match_id, patch, duration, queue, game_timestamp)
             VALUES (:match_id, :patch, :duration, :queue, :game_timestamp)
-            ON CONFLICT (match_id) DO NOTHING
+            ON CONFLICT (match_id, patch) DO NOTHING
         """),
         match,
     )
@@ -116,9 +178,9 @@ async def upsert_participants(session: AsyncSession, participants: list[dict]):
         return
     await session.execute(
         text("""
-            INSERT INTO participants (match_id, puuid, champion, role, win)
-            VALUES (:match_id, :puuid, :champion, :role, :win)
-            ON CONFLICT (match_id, puuid) DO NOTHING
+            INSERT INTO participants (match_id, patch, puuid, champion, role, win)
+            VALUES (:match_id, :patch, :puuid, :champion, :role, :win)
+            ON CONFLICT (match_id, puuid, patch) DO NOTHING
         """),
         participants,
     )
@@ -126,8 +188,8 @@ async def upsert_participants(session: AsyncSession, participants: list[dict]):
 
 async def upsert_snapshots(session: AsyncSession, snapshots: list[dict]):
     """Insert timeline snapshots, skipping duplicates.
-    Each snapshot dict must have an 'items' key that is a list — it will be
-    serialised to JSON automatically.
+    Each snapshot dict must have the match's 'patch' and an 'items' key that
+    is a list — it will be serialised to JSON automatically.
     """
     if not snapshots:
         return
@@ -137,12 +199,172 @@ async def upsert_snapshots(session: AsyncSession, snapshots: list[dict]):
     await session.execute(
         text("""
             INSERT INTO timeline_snapshots
-                (match_id, puuid, timestamp_minute, cs, gold, xp, level,
+                (match_id, patch, puuid, timestamp_minute, cs, gold, xp, level,
                  kills, deaths, assists, vision_score, items)
             VALUES
-                (:match_id, :puuid, :timestamp_minute, :cs, :gold, :xp, :level,
+                (:match_id, :patch, :puuid, :timestamp_minute, :cs, :gold, :xp, :level,
                  :kills, :deaths, :assists, :vision_score, :items)
-            ON CONFLICT (match_id, puuid, timestamp_minute) DO NOTHING
+            ON CONFLICT (match_id, puuid, timestamp_minute, patch) DO NOTHING
         """),
         snapshots,
     )
+
+
+_ROLLUP_METRICS = ("cs", "gold", "xp", "level", "kills", "deaths", "assists")
+
+
+_ROLLUP_COLUMNS = ", ".join(f"n_{m}, sum_{m}" for m in _ROLLUP_METRICS)
+_ROLLUP_AGGREGATES = ", ".join(f"COUNT({m}), COALESCE(SUM({m}), 0)" for m in _ROLLUP_METRICS)
+_ROLLUP_INCREMENTS = ",\n            ".join(
+    f"n_{m} = benchmark_rollup.n_{m} + EXCLUDED.n_{m}, "
+    f"sum_{m} = benchmark_rollup.sum_{m} + EXCLUDED.sum_{m}"
+    for m in _ROLLUP_METRICS
+)
+
+# Module-level so test_benchmark_schema.py can EXPLAIN exactly what runs here
+_REFRESH_ROLLUP = text(f"""
+    WITH new_matches AS (
+        INSERT INTO benchmark_rollup_matches (patch, match_id)
+        SELECT m.patch, m.match_id FROM matches m
+        WHERE NOT EXISTS (
+            SELECT 1 FROM benchmark_rollup_matches r WHERE r.patch = m.patch AND r.match_id = m.match_id
+        )
+        RETURNING patch, match_id
+    ),
+    snapshots AS (
+        SELECT
+            ts.patch,
+            pl.rank,
+            UPPER(COALESCE(p.role, ''))     AS role,
+            LOWER(COALESCE(p.champion, '')) AS champion,
+            ts.timestamp_minute,
+            {", ".join(f"ts.{m}" for m in _ROLLUP_METRICS)}
+        FROM new_matches nm
+        JOIN timeline_snapshots ts ON ts.patch = nm.patch AND ts.match_id = nm.match_id
+        JOIN participants p ON ts.patch = p.patch AND ts.match_id = p.match_id AND ts.puuid = p.puuid
+        JOIN players     pl ON ts.puuid = pl.puuid
+    ),
+    folded AS (
+        INSERT INTO benchmark_rollup (patch, rank, role, champion, timestamp_minute, {_ROLLUP_COLUMNS})
+        SELECT
+            patch,
+            rank,
+            CASE WHEN GROUPING(role) = 1 THEN '*' ELSE role END,
+            CASE WHEN GROUPING(champion) = 1 THEN '*' ELSE champion END,
+            timestamp_minute,
+            {_ROLLUP_AGGREGATES}
+        FROM snapshots
+        GROUP BY GROUPING SETS (
+            (patch, rank, role, champion, timestamp_minute),
+            (patch, rank, role, timestamp_minute),
+            (patch, rank, champion, timestamp_minute),
+            (patch, rank, timestamp_minute)
+        )
+        ON CONFLICT (patch, rank, role, champion, timestamp_minute) DO UPDATE SET
+            {_ROLLUP_INCREMENTS}
+    )
+    SELECT patch, match_id FROM new_matches
+""")
+
+_ROLLUP_SNAPSHOTS = text(f"""
+    SELECT
+        ts.patch,
+        pl.rank,
+        UPPER(COALESCE(p.role, '')),
+        LOWER(COALESCE(p.champion, '')),
+        ts.timestamp_minute,
+        {", ".join(f"ts.{m}" for m in _ROLLUP_METRICS)}
+    FROM timeline_snapshots ts
+    JOIN participants p ON ts.patch = p.patch AND ts.match_id = p.match_id AND ts.puuid = p.puuid
+    JOIN players     pl ON ts.puuid = pl.puuid
+    WHERE ts.patch = ANY(:patches) AND ts.match_id = ANY(:match_ids) AND pl.rank = ANY(:ranks)
+""")
+
+
+async def refresh_benchmark_rollup(session: AsyncSession) -> list[tuple[str, str]]:
+    """Fold every match not yet in benchmark_rollup into it and return their
+    (patch, match_id). Each (patch, rank, role, champion, minute) row is also summed into its
+    role='*' / champion='*' wildcards, so any benchmark filter is a lookup of
+    one row per rank and minute. Ranks are taken as of the refresh.
+    """
+    result = await session.execute(_REFRESH_ROLLUP)
+    return [tuple(row) for row in result.fetchall()]
+
+
+async def get_rollup_snapshots(session: AsyncSession, matches: list[tuple[str, str]], ranks: list[str]) -> list[tuple]:
+    """(patch, rank, role, champion, minute, *metrics) for every snapshot of the
+    (patch, match_id) `matches` whose player is in `ranks`, normalized the same
+    way as benchmark_rollup."""
+    if not matches:
+        return []
+    params = {
+        "patches":   sorted({patch for patch, _ in matches}),
+        "match_ids": [match_id for _, match_id in matches],
+        "ranks":     ranks,
+    }
+    result = await session.execute(_ROLLUP_SNAPSHOTS, params)
+    return result.fetchall()
+
+
+async def get_benchmark_sketches(session: AsyncSession, keys: list[tuple]) -> dict[tuple, bytes]:
+    """Stored sketches for (patch, rank, role, champion, minute, metric) keys; missing keys are absent."""
+    if not keys:
+        return {}
+    patches, ranks, roles, champions, minutes, metrics = (list(col) for col in zip(*keys))
+    result = await session.execute(
+        text("""
+            SELECT s.patch, s.rank, s.role, s.champion, s.timestamp_minute, s.metric, s.sketch
+            FROM benchmark_sketches s
+            JOIN unnest(
+                CAST(:patches AS TEXT[]), CAST(:ranks AS TEXT[]), CAST(:roles AS TEXT[]),
+                CAST(:champions AS TEXT[]), CAST(:minutes AS INTEGER[]), CAST(:metrics AS TEXT[])
+            ) AS k(patch, rank, role, champion, timestamp_minute, metric)
+            USING (patch, rank, role, champion, timestamp_minute, metric)
+        """),
+        {
+            "patches": patches, "ranks": ranks, "roles": roles,
+            "champions": champions, "minutes": minutes, "metrics": metrics,
+        },
+    )
+    return {tuple(row[:6]): bytes(row[6]) for row in result.fetchall()}
+
+
+async def upsert_benchmark_sketches(session: AsyncSession, rows: list[dict]):
+    """Insert or replace sketches; rows already hold the merged sketch."""
+    if not rows:
+        return
+    await session.execute(
+        text("""
+            INSERT INTO benchmark_sketches (patch, rank, role, champion, timestamp_minute, metric, sketch)
+            VALUES (:patch, :rank, :role, :champion, :timestamp_minute, :metric, :sketch)
+            ON CONFLICT (patch, rank, role, champion, timestamp_minute, metric) DO UPDATE SET
+                sketch = EXCLUDED.sketch
+        """),
+        rows,
+    )
+
+
+async def publish_dataset_version(session: AsyncSession, patches: list[str]) -> int:
+    """Bump the benchmark dataset version so API workers re-query benchmarks,
+    recording the retained `patches` (newest first). Call once the run's
+    rollup and sketches are written. Returns the new version."""
+    result = await session.execute(
+        text("""
+            INSERT INTO dataset_version (id, version, patches) VALUES (TRUE, 1, :patches)
+            ON CONFLICT (id) DO UPDATE SET
+                version      = dataset_version.version + 1,
+                patches      = EXCLUDED.patches,
+                published_at = NOW()
+            RETURNING version
+        """),
+        {"patches": patches},
+    )
+    return result.scalar_one()
+
+
+async def get_dataset_version(session: AsyncSession) -> tuple[int, list[str]] | None:
+    """(version, patches newest first) as last published, or None before the
+    first pipeline run."""
+    result = await session.execute(text("SELECT version, patches FROM dataset_version"))
+    row = result.first()
+    return (row[0], list(row[1])) if row is not None else None
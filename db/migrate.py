@@ -0,0 +1,84 @@
+"""
+Apply the SQL files in db/migrations in filename order, each exactly once.
+
+    python -m db.migrate            # apply pending migrations
+    python -m db.migrate --status   # list applied and pending migrations
+
+Applied versions are recorded in schema_migrations. Each file runs in its own
+transaction together with its bookkeeping row, so a failed migration leaves
+nothing behind and is retried on the next run.
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from db.client import engine
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def _migration_files() -> list[tuple[str, str]]:
+    """(version, path) for every migration, ordered by filename."""
+    return [
+        (name.removesuffix(".sql"), os.path.join(MIGRATIONS_DIR, name))
+        for name in sorted(os.listdir(MIGRATIONS_DIR))
+        if name.endswith(".sql")
+    ]
+
+
+async def _applied(conn) -> set[str]:
+    await conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """))
+    result = await conn.execute(text("SELECT version FROM schema_migrations"))
+    return {row[0] for row in result.fetchall()}
+
+
+async def migrate() -> list[str]:
+    """Apply pending migrations and return their versions."""
+    async with engine.begin() as conn:
+        applied = await _applied(conn)
+
+    done = []
+    for version, path in _migration_files():
+        if version in applied:
+            continue
+        with open(path) as f:
+            script = f.read()
+        async with engine.begin() as conn:
+            # Recorded first so the transaction is open before the script runs
+            await conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:v)"), {"v": version})
+            # Files hold several statements, which only asyncpg's simple-query
+            # path accepts — not SQLAlchemy's prepared statements
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.execute(script)
+        print(f"  Applied {version}")
+        done.append(version)
+    return done
+
+
+async def status():
+    async with engine.begin() as conn:
+        applied = await _applied(conn)
+    for version, _ in _migration_files():
+        print(f"  {'applied' if version in applied else 'pending'}  {version}")
+
+
+async def main():
+    if "--status" in sys.argv[1:]:
+        await status()
+    else:
+        done = await migrate()
+        print(f"{len(done)} migration(s) applied." if done else "Database is up to date.")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+-- Base tables. Formerly db/schema.sql; every statement is IF NOT EXISTS, so
+-- this is a no-op on databases that were initialized from that file.
+-- Apply with: python -m db.migrate
+
+CREATE TABLE IF NOT EXISTS players (
+    puuid    TEXT PRIMARY KEY,
+    rank     TEXT NOT NULL,
+    lp       INTEGER,
+    region   TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS matches (
+    match_id        TEXT PRIMARY KEY,
+    patch           TEXT,
+    duration        INTEGER,   -- seconds
+    queue           TEXT,
+    game_timestamp  TIMESTAMPTZ
+);
+
+CREATE TABLE IF NOT EXISTS participants (
+    id        BIGSERIAL PRIMARY KEY,
+    match_id  TEXT    NOT NULL REFERENCES matches(match_id),
+    puuid     TEXT    NOT NULL REFERENCES players(puuid),
+    champion  TEXT,
+    role      TEXT,
+    win       BOOLEAN,
+    UNIQUE (match_id, puuid)
+);
+
+CREATE TABLE IF NOT EXISTS timeline_snapshots (
+    id               BIGSERIAL PRIMARY KEY,
+    match_id         TEXT    NOT NULL REFERENCES matches(match_id),
+    puuid            TEXT    NOT NULL REFERENCES players(puuid),
+    timestamp_minute INTEGER NOT NULL,  -- 5, 10, 15, 20, 25, 30
+    cs               INTEGER,
+    gold             INTEGER,
+    xp               INTEGER,
+    level            INTEGER,
+    kills            INTEGER,
+    deaths           INTEGER,
+    assists          INTEGER,
+    vision_score     INTEGER,
+    items            JSONB,
+    UNIQUE (match_id, puuid, timestamp_minute)
+);
+
+-- Persistent item lookup table — never cleared between pipeline runs.
+-- Keyed by (item_id, patch) so data stays correct across game updates.
+-- Populated automatically from DDragon whenever a new patch is encountered.
+CREATE TABLE IF NOT EXISTS item_catalog (
+    item_id     INTEGER NOT NULL,
+    patch       TEXT    NOT NULL,
+    name        TEXT,
+    description TEXT,
+    tags        JSONB,
+    stats       JSONB,
+    PRIMARY KEY (item_id, patch)
+);
+
+-- Per-minute sums and counts behind get_benchmark(), so a benchmark lookup
+-- reads a handful of pre-aggregated rows instead of averaging every snapshot.
+-- Maintained by refresh_benchmark_rollup() at the end of each pipeline run.
+--   role:     UPPER(role),     '' when unknown, '*' = all roles
+--   champion: LOWER(champion), '' when unknown, '*' = all champions
+-- n_<metric> counts non-null values, so SUM(sum_x) / SUM(n_x) equals AVG(x).
+CREATE TABLE IF NOT EXISTS benchmark_rollup (
+    rank             TEXT    NOT NULL,
+    role             TEXT    NOT NULL,
+    champion         TEXT    NOT NULL,
+    timestamp_minute INTEGER NOT NULL,
+    n_cs      BIGINT NOT NULL DEFAULT 0,  sum_cs      BIGINT NOT NULL DEFAULT 0,
+    n_gold    BIGINT NOT NULL DEFAULT 0,  sum_gold    BIGINT NOT NULL DEFAULT 0,
+    n_xp      BIGINT NOT NULL DEFAULT 0,  sum_xp      BIGINT NOT NULL DEFAULT 0,
+    n_level   BIGINT NOT NULL DEFAULT 0,  sum_level   BIGINT NOT NULL DEFAULT 0,
+    n_kills   BIGINT NOT NULL DEFAULT 0,  sum_kills   BIGINT NOT NULL DEFAULT 0,
+    n_deaths  BIGINT NOT NULL DEFAULT 0,  sum_deaths  BIGINT NOT NULL DEFAULT 0,
+    n_assists BIGINT NOT NULL DEFAULT 0,  sum_assists BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (rank, role, champion, timestamp_minute)
+);
+
+-- Matches already folded into benchmark_rollup, so each refresh only
+-- aggregates the matches stored since the previous one.
+CREATE TABLE IF NOT EXISTS benchmark_rollup_matches (
+    match_id TEXT PRIMARY KEY
+);
+
+-- Serialized t-digests (player_scanner/sketch.py) of each metric's values per
+-- (rank, role, champion, minute), with the same '*' wildcard rows as
+-- benchmark_rollup. Sketches merge, so any rank subset gets percentiles
+-- without reading timeline_snapshots. Benchmark tiers only.
+CREATE TABLE IF NOT EXISTS benchmark_sketches (
+    rank             TEXT    NOT NULL,
+    role             TEXT    NOT NULL,
+    champion         TEXT    NOT NULL,
+    timestamp_minute INTEGER NOT NULL,
+    metric           TEXT    NOT NULL,
+    sketch           BYTEA   NOT NULL,
+    PRIMARY KEY (rank, role, champion, timestamp_minute, metric)
+);
+
+-- Single row, bumped by the pipeline after each run. API workers cache
+-- benchmark results per version and re-query once it changes. Never cleared.
+CREATE TABLE IF NOT EXISTS dataset_version (
+    id           BOOLEAN     PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version      BIGINT      NOT NULL,
+    published_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,32 @@
+-- Indexes for the benchmark read path and the pipeline's refresh queries.
+-- test_benchmark_schema.py checks the resulting plans and latencies.
+--
+-- No new indexes on timeline_snapshots or participants: since /timeline reads
+-- benchmark_rollup, nothing filters them by role, champion or rank any more,
+-- and every pipeline access to them is by match_id (+ puuid), which the
+-- UNIQUE constraints already index. Extra indexes there would only slow down
+-- process_match's inserts into the two largest tables.
+
+-- get_benchmark(): WHERE role = ? AND champion = ? AND rank IN (...), grouped
+-- by minute. Equality columns first and the sums included, so the lookup is
+-- an index-only scan of ~18 entries.
+CREATE INDEX IF NOT EXISTS benchmark_rollup_lookup
+    ON benchmark_rollup (role, champion, rank, timestamp_minute)
+    INCLUDE (
+        n_cs, sum_cs, n_gold, sum_gold, n_xp, sum_xp, n_level, sum_level,
+        n_kills, sum_kills, n_deaths, sum_deaths, n_assists, sum_assists
+    );
+
+-- Same shape for the percentile sketches (the sketch itself stays in the heap).
+CREATE INDEX IF NOT EXISTS benchmark_sketches_lookup
+    ON benchmark_sketches (role, champion, rank, timestamp_minute, metric);
+
+-- refresh_benchmark_sketches() reads the new matches' snapshots of
+-- benchmark-tier players only; without this the rank filter is a full scan
+-- of players (every participant PUUID, ~10x the tracked players).
+CREATE INDEX IF NOT EXISTS players_rank
+    ON players (rank) INCLUDE (puuid);
+
+-- The pipeline's SELECT DISTINCT patch FROM matches after each run.
+CREATE INDEX IF NOT EXISTS matches_patch
+    ON matches (patch);
@@ -0,0 +1,177 @@
+-- Partition match data by patch, so the pipeline appends each run and ages
+-- out whole patches with DROP TABLE instead of truncating everything.
+--
+-- Each patch gets one partition per table, named <table>_p<patch> with dots
+-- replaced (timeline_snapshots_p15_3), created by ensure_patch_partitions()
+-- before the pipeline stores the first match of that patch. Rows for a patch
+-- without partitions (e.g. an empty gameVersion) land in <table>_default.
+--
+-- Unique keys on partitioned tables must contain the partition key, so patch
+-- joins every key. The foreign keys are dropped: a referenced partition can't
+-- be dropped in constant time, the players no longer in any match couldn't be
+-- pruned without a puuid index on both big tables, and the pipeline writes a
+-- match, its players and its rows in one transaction anyway.
+--
+-- Existing rows are moved over: the old tables are renamed out of the way,
+-- their rows inserted into the new partitions once, and the old tables
+-- dropped. The rollup and sketches gain a patch column and start empty; the
+-- next pipeline run rebuilds them from the raw rows.
+
+ALTER TABLE matches            RENAME TO matches_unpartitioned;
+ALTER TABLE participants       RENAME TO participants_unpartitioned;
+ALTER TABLE timeline_snapshots RENAME TO timeline_snapshots_unpartitioned;
+
+-- Index names are schema-wide: free the primary key names for the new tables.
+-- matches_patch (0002) isn't recreated — partition pruning on patch does its job.
+ALTER INDEX matches_pkey            RENAME TO matches_unpartitioned_pkey;
+ALTER INDEX participants_pkey       RENAME TO participants_unpartitioned_pkey;
+ALTER INDEX timeline_snapshots_pkey RENAME TO timeline_snapshots_unpartitioned_pkey;
+DROP INDEX IF EXISTS matches_patch;
+
+CREATE TABLE matches (
+    match_id        TEXT NOT NULL,
+    patch           TEXT NOT NULL,
+    duration        INTEGER,   -- seconds
+    queue           TEXT,
+    game_timestamp  TIMESTAMPTZ,
+    PRIMARY KEY (match_id, patch)
+) PARTITION BY LIST (patch);
+
+CREATE TABLE participants (
+    match_id  TEXT    NOT NULL,
+    patch     TEXT    NOT NULL,
+    puuid     TEXT    NOT NULL,
+    champion  TEXT,
+    role      TEXT,
+    win       BOOLEAN,
+    PRIMARY KEY (match_id, puuid, patch)
+) PARTITION BY LIST (patch);
+
+CREATE TABLE timeline_snapshots (
+    match_id         TEXT    NOT NULL,
+    patch            TEXT    NOT NULL,
+    puuid            TEXT    NOT NULL,
+    timestamp_minute INTEGER NOT NULL,  -- 5, 10, 15, 20, 25, 30
+    cs               INTEGER,
+    gold             INTEGER,
+    xp               INTEGER,
+    level            INTEGER,
+    kills            INTEGER,
+    deaths           INTEGER,
+    assists          INTEGER,
+    vision_score     INTEGER,
+    items            JSONB,
+    PRIMARY KEY (match_id, puuid, timestamp_minute, patch)
+) PARTITION BY LIST (patch);
+
+CREATE TABLE matches_default            PARTITION OF matches            DEFAULT;
+CREATE TABLE participants_default       PARTITION OF participants       DEFAULT;
+CREATE TABLE timeline_snapshots_default PARTITION OF timeline_snapshots DEFAULT;
+
+
+CREATE FUNCTION patch_partition_suffix(p TEXT) RETURNS TEXT
+    LANGUAGE sql IMMUTABLE
+    AS $$ SELECT 'p' || regexp_replace(lower(p), '[^0-9a-z]', '_', 'g') $$;
+
+-- Create the three partitions for patch `p` if they don't exist yet.
+CREATE FUNCTION ensure_patch_partitions(p TEXT) RETURNS void
+    LANGUAGE plpgsql AS $$
+DECLARE
+    t TEXT;
+BEGIN
+    IF p = '' THEN
+        RETURN;     -- stays in the default partitions
+    END IF;
+    FOREACH t IN ARRAY ARRAY['matches', 'participants', 'timeline_snapshots'] LOOP
+        IF to_regclass(t || '_' || patch_partition_suffix(p)) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES IN (%L)',
+                           t || '_' || patch_partition_suffix(p), t, p);
+        END IF;
+    END LOOP;
+END $$;
+
+-- Drop patch `p`'s partitions along with its rollup and sketch rows.
+CREATE FUNCTION drop_patch_partitions(p TEXT) RETURNS void
+    LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format('DROP TABLE IF EXISTS %I, %I, %I',
+                   'timeline_snapshots_' || patch_partition_suffix(p),
+                   'participants_' || patch_partition_suffix(p),
+                   'matches_' || patch_partition_suffix(p));
+    DELETE FROM benchmark_rollup         WHERE patch = p;
+    DELETE FROM benchmark_sketches       WHERE patch = p;
+    DELETE FROM benchmark_rollup_matches WHERE patch = p;
+END $$;
+
+
+SELECT ensure_patch_partitions(patch)
+FROM (SELECT DISTINCT COALESCE(patch, '') AS patch FROM matches_unpartitioned) existing;
+
+INSERT INTO matches (match_id, patch, duration, queue, game_timestamp)
+SELECT match_id, COALESCE(patch, ''), duration, queue, game_timestamp
+FROM matches_unpartitioned;
+
+INSERT INTO participants (match_id, patch, puuid, champion, role, win)
+SELECT p.match_id, COALESCE(m.patch, ''), p.puuid, p.champion, p.role, p.win
+FROM participants_unpartitioned p
+JOIN matches_unpartitioned m USING (match_id);
+
+INSERT INTO timeline_snapshots
+    (match_id, patch, puuid, timestamp_minute, cs, gold, xp, level,
+     kills, deaths, assists, vision_score, items)
+SELECT ts.match_id, COALESCE(m.patch, ''), ts.puuid, ts.timestamp_minute, ts.cs, ts.gold, ts.xp, ts.level,
+       ts.kills, ts.deaths, ts.assists, ts.vision_score, ts.items
+FROM timeline_snapshots_unpartitioned ts
+JOIN matches_unpartitioned m USING (match_id);
+
+DROP TABLE timeline_snapshots_unpartitioned, participants_unpartitioned, matches_unpartitioned;
+
+
+-- Benchmark aggregates, now per patch so reads can prune to recent patches
+DROP TABLE benchmark_rollup, benchmark_rollup_matches, benchmark_sketches;
+
+CREATE TABLE benchmark_rollup (
+    patch            TEXT    NOT NULL,
+    rank             TEXT    NOT NULL,
+    role             TEXT    NOT NULL,
+    champion         TEXT    NOT NULL,
+    timestamp_minute INTEGER NOT NULL,
+    n_cs      BIGINT NOT NULL DEFAULT 0,  sum_cs      BIGINT NOT NULL DEFAULT 0,
+    n_gold    BIGINT NOT NULL DEFAULT 0,  sum_gold    BIGINT NOT NULL DEFAULT 0,
+    n_xp      BIGINT NOT NULL DEFAULT 0,  sum_xp      BIGINT NOT NULL DEFAULT 0,
+    n_level   BIGINT NOT NULL DEFAULT 0,  sum_level   BIGINT NOT NULL DEFAULT 0,
+    n_kills   BIGINT NOT NULL DEFAULT 0,  sum_kills   BIGINT NOT NULL DEFAULT 0,
+    n_deaths  BIGINT NOT NULL DEFAULT 0,  sum_deaths  BIGINT NOT NULL DEFAULT 0,
+    n_assists BIGINT NOT NULL DEFAULT 0,  sum_assists BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (patch, rank, role, champion, timestamp_minute)
+);
+
+CREATE INDEX benchmark_rollup_lookup
+    ON benchmark_rollup (role, champion, rank, patch, timestamp_minute)
+    INCLUDE (
+        n_cs, sum_cs, n_gold, sum_gold, n_xp, sum_xp, n_level, sum_level,
+        n_kills, sum_kills, n_deaths, sum_deaths, n_assists, sum_assists
+    );
+
+CREATE TABLE benchmark_rollup_matches (
+    patch    TEXT NOT NULL,
+    match_id TEXT NOT NULL,
+    PRIMARY KEY (patch, match_id)
+);
+
+CREATE TABLE benchmark_sketches (
+    patch            TEXT    NOT NULL,
+    rank             TEXT    NOT NULL,
+    role             TEXT    NOT NULL,
+    champion         TEXT    NOT NULL,
+    timestamp_minute INTEGER NOT NULL,
+    metric           TEXT    NOT NULL,
+    sketch           BYTEA   NOT NULL,
+    PRIMARY KEY (patch, rank, role, champion, timestamp_minute, metric)
+);
+
+CREATE INDEX benchmark_sketches_lookup
+    ON benchmark_sketches (role, champion, rank, patch, timestamp_minute, metric);
+
+-- Retained patches, newest first, published with each dataset version
+ALTER TABLE dataset_version ADD COLUMN patches TEXT[] NOT NULL DEFAULT '{}';
@@ -3,8 +3,8 @@
 import { useEffect, useState } from 'react';
 import Link from 'next/link';
 import {
-  fetchPlayer, fetchAnalysis, fetchTimeline,
-  PlayerData, FilteredAnalysis, PerMinuteSnapshot,
+  fetchPlayer, fetchMatches, fetchChampionPool, fetchAnalysis, fetchTimeline,
+  PlayerData, MatchSummary, ChampionStats, FilteredAnalysis, PerMinuteSnapshot,
   ROLES, ALL_RANKS,
 } from '@/lib/api';
 import ProfileHeader from '@/components/ProfileHeader';
@@ -27,6 +27,13 @@ export default function PlayerPage({ gameName, tagLine }: Props) {
   const [loadingPlayer, setLoadingPlayer] = useState(true);
   const [playerError, setPlayerError] = useState('');
 
+  // The scan only carries the first page of matches, and the champion pool,
+  // filters and analysis cover the games loaded so far. Older games are only
+  // fetched when the user pages in more history.
+  const [matches, setMatches] = useState<MatchSummary[]>([]);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [championPool, setChampionPool] = useState<ChampionStats[]>([]);
+
   // Filter state
   const [role, setRole] = useState('');
   const [champion, setChampion] = useState('');
@@ -40,11 +47,33 @@ export default function PlayerPage({ gameName, tagLine }: Props) {
 
   useEffect(() => {
     fetchPlayer(gameName, tagLine)
-      .then(setData)
+      .then((d) => {
+        setData(d);
+        setMatches(d.recent_matches);
+        setChampionPool(d.champion_pool);
+      })
       .catch((e) => setPlayerError(e.message))
       .finally(() => setLoadingPlayer(false));
   }, [gameName, tagLine]);
 
+  // `limit` omitted loads the next page; data.total_matches loads the rest.
+  async function loadMoreMatches(limit?: number) {
+    if (!data) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchMatches(gameName, tagLine, matches.length, limit);
+      const loaded = matches.length + page.matches.length;
+      setMatches((prev) => [...prev, ...page.matches]);
+      // Served from the match details the page just fetched
+      const pool = await fetchChampionPool(gameName, tagLine, loaded);
+      if (pool.length) setChampionPool(pool);
+    } catch {
+      // Leave the buttons in place to retry
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   function toggleRank(rank: string) {
     setSelectedRanks((prev) => {
       if (prev.includes(rank)) {
@@ -63,9 +92,14 @@ export default function PlayerPage({ gameName, tagLine }: Props) {
     setAnalysis(null);
     setTimeline([]);
 
+    // Same games as the history shown below; the server defaults to the first page
+    const count = matches.length > data.recent_matches.length ? matches.length : undefined;
     const [a, t] = await Promise.all([
-      fetchAnalysis(gameName, tagLine, 'na1', role || undefined, champion || undefined),
-      fetchTimeline(gameName, tagLine, 'na1', role || undefined, champion || undefined, selectedRanks),
+      fetchAnalysis(gameName, tagLine, 'na1', role || undefined, champion || undefined, count),
+      fetchTimeline(
+        gameName, tagLine, 'na1', role || undefined, champion || undefined, selectedRanks,
+        undefined, count,
+      ),
     ]);
 
     setLoadingAnalysis(false);
@@ -78,9 +112,10 @@ export default function PlayerPage({ gameName, tagLine }: Props) {
   }
 
   const ddragonVersion = data?.profile.profile_icon_url.split('/')[4] ?? '16.11.1';
-  const champions = data
-    ? [...new Set(data.recent_matches.map((m) => m.champion))].sort()
-    : [];
+  const champions = [...new Set([
+    ...championPool.map((c) => c.champion),
+    ...matches.map((m) => m.champion),
+  ])].sort();
 
   if (loadingPlayer) {
     return (
@@ -119,8 +154,8 @@ export default function PlayerPage({ gameName, tagLine }: Props) {
         {/* Section 1: Profile + champion pool side-by-side */}
         <ProfileHeader
           profile={data.profile}
-          matches={data.recent_matches}
-          championPool={data.champion_pool}
+          matches={matches}
+          championPool={championPool}
           ddragonVersion={ddragonVersion}
         />
 
@@ -184,6 +219,10 @@ export default function PlayerPage({ gameName, tagLine }: Props) {
               >
                 {loadingAnalysis ? 'Analyzing…' : 'Analyze'}
               </button>
+              <span className="text-xs text-gray-500 self-center">
+                Covers your {matches.length} most recent games
+                {matches.length < data.total_matches && ' — load more history below to include older ones'}
+              </span>
             </div>
           </div>
 
@@ -209,7 +248,25 @@ export default function PlayerPage({ gameName, tagLine }: Props) {
           <h2 className="text-xs font-bold tracking-widest text-gray-500 mb-3 uppercase">
             Match History
           </h2>
-          <MatchHistory matches={data.recent_matches} ddragonVersion={ddragonVersion} />
+          <MatchHistory matches={matches} ddragonVersion={ddragonVersion} />
+          {matches.length < data.total_matches && (
+            <div className="mt-3 flex gap-3">
+              <button
+                onClick={() => loadMoreMatches()}
+                disabled={loadingMore}
+                className="flex-1 border border-[#1e2d3d] hover:border-[#c89b3c] disabled:opacity-50 text-gray-400 rounded py-2 text-sm transition-colors"
+              >
+                {loadingMore ? 'Loading…' : `Load more (${matches.length} of ${data.total_matches})`}
+              </button>
+              <button
+                onClick={() => loadMoreMatches(data.total_matches - matches.length)}
+                disabled={loadingMore}
+                className="border border-[#1e2d3d] hover:border-[#c89b3c] disabled:opacity-50 text-gray-400 rounded px-4 py-2 text-sm transition-colors"
+              >
+                Load all
+              </button>
+            </div>
+          )}
         </section>
 
       </div>
@@ -71,14 +71,29 @@ export interface PerMinuteSnapshot {
   benchmark_kills: number | null;
   benchmark_deaths: number | null;
   benchmark_assists: number | null;
+  percentile_cs: number | null;
+  percentile_gold: number | null;
+  percentile_xp: number | null;
+  percentile_level: number | null;
+  percentile_kills: number | null;
+  percentile_deaths: number | null;
+  percentile_assists: number | null;
 }
 
 export interface PlayerData {
   profile: PlayerProfile;
   recent_matches: MatchSummary[];
+  total_matches: number;
   champion_pool: ChampionStats[];
 }
 
+export interface MatchPage {
+  offset: number;
+  limit: number;
+  total: number;
+  matches: MatchSummary[];
+}
+
 // ── Fetch functions ───────────────────────────────────────────────────────────
 
 export async function fetchPlayer(
@@ -94,16 +109,47 @@ export async function fetchPlayer(
   return res.json();
 }
 
+export async function fetchMatches(
+  gameName: string,
+  tagLine: string,
+  offset: number,
+  limit = 20,
+  platform = 'na1'
+): Promise<MatchPage> {
+  const params = new URLSearchParams({ platform, offset: String(offset), limit: String(limit) });
+  const res = await fetch(`${API}/player/${gameName}/${tagLine}/matches?${params}`);
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({ detail: 'Could not load matches' }));
+    throw new Error(err.detail || 'Could not load matches');
+  }
+  return res.json();
+}
+
+export async function fetchChampionPool(
+  gameName: string,
+  tagLine: string,
+  matches?: number,
+  platform = 'na1'
+): Promise<ChampionStats[]> {
+  const params = new URLSearchParams({ platform });
+  if (matches) params.set('matches', String(matches));
+  const res = await fetch(`${API}/player/${gameName}/${tagLine}/champions?${params}`);
+  if (!res.ok) return [];
+  return res.json();
+}
+
 export async function fetchAnalysis(
   gameName: string,
   tagLine: string,
   platform = 'na1',
   role?: string,
-  champion?: string
+  champion?: string,
+  matches?: number
 ): Promise<FilteredAnalysis | null> {
   const params = new URLSearchParams({ platform });
   if (role) params.set('role', role);
   if (champion) params.set('champion', champion);
+  if (matches) params.set('matches', String(matches));
   const res = await fetch(`${API}/player/${gameName}/${tagLine}/analysis?${params}`);
   if (!res.ok) return null;
   return res.json();
@@ -119,11 +165,15 @@ export async function fetchTimeline(
   role?: string,
   champion?: string,
   ranks: string[] = [...ALL_RANKS],
+  patches?: number,
+  matches?: number,
 ): Promise<PerMinuteSnapshot[]> {
   const params = new URLSearchParams({ platform });
   if (role) params.set('role', role);
   if (champion) params.set('champion', champion);
   ranks.forEach((r) => params.append('ranks', r));
+  if (patches) params.set('patches', String(patches));
+  if (matches) params.set('matches', String(matches));
   const res = await fetch(`${API}/player/${gameName}/${tagLine}/timeline?${params}`);
   if (!res.ok) return [];
   return res.json();
@@ -2,107 +2,114 @@
 pipeline.py — MVP 1: Benchmark Dataset Collection
 
 Pulls Challenger / Grandmaster / Master players from NA,
-walks their recent ranked match history, and writes
+walks their recent ranked match history, and appends new
 players, matches, participants, and timeline snapshots
-to the Supabase database.
+to the Supabase database. Match data is partitioned by patch;
+each run drops the patches older than the RETAIN_PATCHES newest.
 
 Usage:
     python pipeline.py
 """
 
 import asyncio
-import aiohttp
+import logging
 import os
 import sys
 from datetime import datetime, timezone
-from sqlalchemy import text
 
 from dotenv import load_dotenv
 
 sys.path.insert(0, os.path.dirname(__file__))
 from db.client import (
     get_session,
-    clear_all_tables,
     get_known_patches,
+    get_stored_patches,
+    get_stored_match_ids,
+    ensure_patch_partitions,
+    drop_old_patches,
     upsert_item_catalog,
     ensure_players_exist,
     upsert_players,
+    demote_unlisted_players,
     upsert_match,
     upsert_participants,
     upsert_snapshots,
+    refresh_benchmark_rollup,
+    publish_dataset_version,
 )
-from backend.fetch_functions.timeline_fetch import extract_snapshots
+from backend.fetch_functions.ddragon_store import ddragon_store
+from backend.fetch_functions.match_store import MATCH, TIMELINE, match_store
+from backend.fetch_functions.riot_client import BATCH, RiotClient
+from backend.fetch_functions.timeline_fetch import extract_snapshots, load_timeline
+from player_scanner.benchmark import refresh_benchmark_sketches
 
 load_dotenv()
-KEY = os.getenv("API_KEY")
+logging.basicConfig(level=logging.WARNING, format="    %(message)s")
 
 PLATFORM  = "na1"
 CONTINENT = "americas"
 
 MATCHES_PER_PLAYER = 10   # per player; keeps storage proportional
 
-# Hard cap on total unique matches stored.
+# Hard cap on total unique matches stored, across all retained patches.
 # At ~13 KB/match, 25k matches ≈ 325 MB — safe under Neon's 0.5 GB free tier.
 MAX_MATCHES = 25_000
 
-# Keep concurrent Riot API requests low on a dev key (20 req/s, 100 req/2 min).
-_sem = asyncio.Semaphore(5)
+# Patches kept in the database; older ones are dropped partition-by-partition
+# at the start of each run. Benchmarks only mean something for recent patches.
+RETAIN_PATCHES = int(os.getenv("RETAIN_PATCHES", "3"))
+
+# Rate limits are scheduled by RiotClient from the key's response headers;
+# this only caps how many requests are in flight at once. The pipeline runs at
+# BATCH priority so it only uses budget that user-facing scans leave free.
+MAX_CONCURRENCY = 5
 
 
 # ---------------------------------------------------------------------------
 # Riot API helpers
 # ---------------------------------------------------------------------------
 
-async def _get(http: aiohttp.ClientSession, url: str) -> dict | list | None:
-    """Async GET with automatic 429 retry."""
-    async with _sem:
-        while True:
-            async with http.get(url, headers={"X-Riot-Token": KEY}) as r:
-                if r.status == 200:
-                    return await r.json()
-                if r.status == 429:
-                    wait = int(r.headers.get("Retry-After", 1))
-                    print(f"    Rate limited — waiting {wait}s...")
-                    await asyncio.sleep(wait)
-                    continue
-                print(f"    HTTP {r.status}: {url}")
-                return None
-
-
-async def fetch_league_entries(http: aiohttp.ClientSession, tier: str) -> list[dict]:
+async def _get(riot: RiotClient, url: str) -> dict | list | None:
+    """Rate-limited GET; returns None on any non-200 response."""
+    return await riot.get(url)
+
+
+async def fetch_league_entries(riot: RiotClient, tier: str) -> list[dict]:
     tier_key = {"CHALLENGER": "challenger", "GRANDMASTER": "grandmaster", "MASTER": "master"}[tier]
     url = (
         f"https://{PLATFORM}.api.riotgames.com"
         f"/lol/league/v4/{tier_key}leagues/by-queue/RANKED_SOLO_5x5"
     )
-    data = await _get(http, url)
+    data = await _get(riot, url)
     return data.get("entries", []) if data else []
 
 
-async def summoner_to_puuid(http: aiohttp.ClientSession, summoner_id: str) -> str | None:
+async def summoner_to_puuid(riot: RiotClient, summoner_id: str) -> str | None:
     url = f"https://{PLATFORM}.api.riotgames.com/lol/summoner/v4/summoners/{summoner_id}"
-    data = await _get(http, url)
+    data = await _get(riot, url)
     return data.get("puuid") if data else None
 
 
-async def fetch_match_ids(http: aiohttp.ClientSession, puuid: str) -> list[str]:
+async def fetch_match_ids(riot: RiotClient, puuid: str) -> list[str]:
     url = (
         f"https://{CONTINENT}.api.riotgames.com"
         f"/lol/match/v5/matches/by-puuid/{puuid}/ids"
         f"?queue=420&count={MATCHES_PER_PLAYER}"
     )
-    data = await _get(http, url)
+    data = await _get(riot, url)
     return data if isinstance(data, list) else []
 
 
-async def fetch_match_data(http: aiohttp.ClientSession, match_id: str) -> dict | None:
+# Match and timeline payloads never change, so both go through the on-disk
+# match store — re-runs only call Riot for matches we haven't seen before.
+async def fetch_match_data(riot: RiotClient, match_id: str) -> dict | None:
     url = f"https://{CONTINENT}.api.riotgames.com/lol/match/v5/matches/{match_id}"
-    return await _get(http, url)
+    return await match_store.fetch(riot, url, match_id, MATCH)
 
 
-async def fetch_timeline_data(http: aiohttp.ClientSession, match_id: str) -> dict | None:
+async def fetch_timeline_data(riot: RiotClient, match_id: str) -> dict | None:
     url = f"https://{CONTINENT}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline"
-    return await _get(http, url)
+    return await match_store.fetch(riot, url, match_id, TIMELINE, loads=load_timeline)
 
 
 # ---------------------------------------------------------------------------
@@ -129,6 +136,7 @@ def parse_match(raw: dict) -> tuple[dict, list[dict]]:
     participant_rows = [
         {
             "match_id": match_row["match_id"],
+            "patch":    patch,
             "puuid":    p["puuid"],
             "champion": p.get("championName"),
             "role":     p.get("teamPosition") or p.get("individualPosition"),
@@ -145,9 +153,10 @@ def parse_match(raw: dict) -> tuple[dict, list[dict]]:
 # ---------------------------------------------------------------------------
 
 async def process_match(
-    http: aiohttp.ClientSession,
+    riot: RiotClient,
     match_id: str,
     processed: set[str],
+    partitioned: set[str],
     stats: dict,
 ):
     if match_id in processed:
@@ -156,8 +165,8 @@ async def process_match(
 
     # Fetch match data and timeline in parallel — two requests per match
     match_data, timeline_data = await asyncio.gather(
-        fetch_match_data(http, match_id),
-        fetch_timeline_data(http, match_id),
+        fetch_match_data(riot, match_id),
+        fetch_timeline_data(riot, match_id),
     )
 
     if not match_data or not timeline_data:
@@ -176,11 +185,16 @@ async def process_match(
     }
     for s in snapshots:
         s["vision_score"] = vision_map.get(s["puuid"])
+        s["patch"] = match_row["patch"]
 
     participant_puuids = [p["puuid"] for p in participant_rows]
 
     async with get_session() as db:
-        # Participants FK → players: ensure every PUUID in this match exists.
+        # The first match of a new patch creates that patch's partitions.
+        if match_row["patch"] not in partitioned:
+            await ensure_patch_partitions(db, match_row["patch"])
+            partitioned.add(match_row["patch"])
+        # Every participant gets a players row (rank UNKNOWN unless tracked).
         await ensure_players_exist(db, participant_puuids)
         await upsert_match(db, match_row)
         await upsert_participants(db, participant_rows)
@@ -192,56 +206,54 @@ async def process_match(
 
 
 async def process_player(
-    http: aiohttp.ClientSession,
+    riot: RiotClient,
     entry: dict,
     tier: str,
     processed: set[str],
+    partitioned: set[str],
     stats: dict,
 ):
     lp = entry.get("leaguePoints", 0)
 
     # Newer Riot API responses include puuid directly on league entries.
     # Fall back to summonerId conversion for older response shapes.
-    puuid = entry.get("puuid") or await summoner_to_puuid(http, entry.get("summonerId", ""))
+    puuid = entry.get("puuid") or await summoner_to_puuid(riot, entry.get("summonerId", ""))
     if not puuid:
         return
 
     async with get_session() as db:
         await upsert_players(db, [{"puuid": puuid, "rank": tier, "lp": lp, "region": PLATFORM}])
 
-    match_ids = await fetch_match_ids(http, puuid)
+    match_ids = await fetch_match_ids(riot, puuid)
     print(f"  [{tier:12s}] {puuid[:16]}…  LP={lp:4d}  matches={len(match_ids)}")
 
     for match_id in match_ids:
-        if stats["matches"] >= MAX_MATCHES:
+        if stats["stored"] + stats["matches"] >= MAX_MATCHES:
             return
-        await process_match(http, match_id, processed, stats)
+        await process_match(riot, match_id, processed, partitioned, stats)
 
 
 # ---------------------------------------------------------------------------
 # DDragon item catalog sync
 # ---------------------------------------------------------------------------
 
-async def fetch_ddragon_versions(http: aiohttp.ClientSession) -> list[str]:
-    url = "https://ddragon.leagueoflegends.com/api/versions.json"
-    async with http.get(url) as r:
-        return await r.json() if r.status == 200 else []
+async def fetch_ddragon_versions(riot: RiotClient) -> list[str]:
+    return await ddragon_store.versions(riot.session)
+
+
+def ddragon_version_for(patch: str, all_versions: list[str]) -> str | None:
+    """DDragon uses full version strings like "14.23.1"; our patch is "14.23"."""
+    return next((v for v in all_versions if v.startswith(patch + ".")), None)
 
 
-async def sync_patch_items(http: aiohttp.ClientSession, patch: str, all_versions: list[str]):
-    """Fetch all items from DDragon for a given patch and store them in item_catalog."""
-    # DDragon uses full version strings like "14.23.1"; our patch is "14.23"
-    full_version = next((v for v in all_versions if v.startswith(patch + ".")), None)
+async def sync_patch_items(patch: str, full_version: str | None, data: dict | None):
+    """Store a patch's DDragon item catalog (fetched by sync_item_catalog) in item_catalog."""
     if not full_version:
         print(f"  No DDragon version found for patch {patch} — skipping")
         return
-
-    url = f"https://ddragon.leagueoflegends.com/cdn/{full_version}/data/en_US/item.json"
-    async with http.get(url) as r:
-        if r.status != 200:
-            print(f"  DDragon request failed ({r.status}) for patch {patch}")
-            return
-        data = await r.json()
+    if data is None:
+        print(f"  DDragon item data unavailable for patch {patch}")
+        return
 
     items = [
         {
@@ -261,29 +273,56 @@ async def sync_patch_items(http: aiohttp.ClientSession, patch: str, all_versions
     print(f"  Synced {len(items)} items for patch {patch} (DDragon {full_version})")
 
 
+async def sync_item_catalog(riot: RiotClient, patches: list[str]):
+    """Sync item_catalog for `patches`. Catalogs come from the local DDragon
+    store; the ones it doesn't have yet are downloaded concurrently."""
+    all_versions = await fetch_ddragon_versions(riot)
+    full_versions = {patch: ddragon_version_for(patch, all_versions) for patch in patches}
+    catalogs = await ddragon_store.prefetch_items(riot.session, [v for v in full_versions.values() if v])
+    for patch in patches:
+        await sync_patch_items(patch, full_versions[patch], catalogs.get(full_versions[patch]))
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
 
 async def main():
-    processed: set[str] = set()
-    stats = {"matches": 0, "snapshots": 0, "skipped": 0}
-
-    print("Clearing existing data for fresh run...")
+    # Drop patches past the retention window. If the kept ones already fill
+    # MAX_MATCHES, drop the oldest of those too so the current patch has room.
+    print(f"Dropping patches beyond the newest {RETAIN_PATCHES}...")
+    keep = RETAIN_PATCHES
     async with get_session() as db:
-        await clear_all_tables(db)
-    print("Tables cleared.\n")
+        dropped = await drop_old_patches(db, keep)
+        processed = await get_stored_match_ids(db)
+        while len(processed) >= MAX_MATCHES and keep > 1:
+            keep -= 1
+            dropped += await drop_old_patches(db, keep)
+            processed = await get_stored_match_ids(db)
+        partitioned = set(await get_stored_patches(db))
+    print(f"  Dropped {', '.join(dropped) or 'nothing'}; {len(processed):,} matches already stored.\n")
+
+    stats = {"stored": len(processed), "matches": 0, "snapshots": 0, "skipped": 0}
 
-    async with aiohttp.ClientSession() as http:
+    async with RiotClient(max_concurrency=MAX_CONCURRENCY, priority=BATCH) as riot:
 
         # Fetch all tier rosters up front
         print("Fetching league rosters...")
         tier_entries: dict[str, list[dict]] = {}
         for tier in ("CHALLENGER", "GRANDMASTER", "MASTER"):
-            entries = await fetch_league_entries(http, tier)
+            entries = await fetch_league_entries(riot, tier)
             tier_entries[tier] = entries
             print(f"  {tier:12s} — {len(entries)} players")
 
+        # Players are kept across runs, so anyone who dropped out of the
+        # rosters goes back to UNKNOWN before this run's matches are rolled
+        # up. Skipped if a roster failed to load, which would demote a tier.
+        if all(tier_entries.values()):
+            listed = [e["puuid"] for entries in tier_entries.values() for e in entries if e.get("puuid")]
+            async with get_session() as db:
+                demoted = await demote_unlisted_players(db, listed)
+            print(f"  Reset {demoted:,} players no longer in Master+ to UNKNOWN")
+
         # Interleave players across tiers so storage is always balanced.
         # e.g. CHALL[0], GM[0], MASTER[0], CHALL[1], GM[1], MASTER[1], ...
         # This guarantees representation from every tier even if we hit MAX_MATCHES early.
@@ -298,32 +337,46 @@ async def main():
         print(f"\n  {total_players} total players — processing in round-robin order\n")
 
         for i, (tier, entry) in enumerate(ordered, 1):
-            if stats["matches"] >= MAX_MATCHES:
+            if stats["stored"] + stats["matches"] >= MAX_MATCHES:
                 print(f"\n  Match cap ({MAX_MATCHES:,}) reached — stopping early.")
                 break
             print(f"  [{i}/{total_players}] {tier}")
-            await process_player(http, entry, tier, processed, stats)
+            await process_player(riot, entry, tier, processed, partitioned, stats)
 
         # Sync item catalog for any patches we haven't seen before.
         # Runs after match collection so we know exactly which patches are in the DB.
         print(f"\n{'='*50}")
         print("Syncing item catalog...")
-        ddragon_versions = await fetch_ddragon_versions(http)
         async with get_session() as db:
             known_patches = await get_known_patches(db)
-        async with get_session() as db:
-            result = await db.execute(text("SELECT DISTINCT patch FROM matches WHERE patch IS NOT NULL"))
-            seen_patches = {row[0] for row in result.fetchall()}
+            seen_patches = set(await get_stored_patches(db))
         new_patches = seen_patches - known_patches
         if new_patches:
-            for patch in sorted(new_patches):
-                await sync_patch_items(http, patch, ddragon_versions)
+            await sync_item_catalog(riot, sorted(new_patches))
         else:
             print("  Item catalog already up to date.")
 
+    # Fold this run's matches into the pre-aggregated benchmark table that
+    # get_benchmark() reads from.
+    print(f"\n{'='*50}")
+    print("Refreshing benchmark rollup...")
+    # One transaction, so a match is never in the rollup without its sketches
+    async with get_session() as db:
+        rolled_up = await refresh_benchmark_rollup(db)
+        sketches = await refresh_benchmark_sketches(db, rolled_up)
+    print(f"  Rolled up {len(rolled_up):,} new matches.")
+    print(f"  Updated {sketches:,} percentile sketches.")
+
+    # Tells API workers to drop their cached benchmark results, and which
+    # patches "last N patches" benchmark queries now cover
+    async with get_session() as db:
+        patches = await get_stored_patches(db)
+        version = await publish_dataset_version(db, patches)
+    print(f"  Published benchmark dataset version {version} (patches {', '.join(patches) or 'none'}).")
+
     print(f"\n{'='*50}")
     print(f"Pipeline complete.")
-    print(f"  Matches stored  : {stats['matches']:,}")
+    print(f"  Matches stored  : {stats['matches']:,} new, {stats['stored'] + stats['matches']:,} total")
     print(f"  Snapshots stored: {stats['snapshots']:,}")
     print(f"  Matches skipped : {stats['skipped']:,}")
 
@@ -1,10 +1,17 @@
 from .scanner import (
     scan_player,
+    scan_player_stream,
+    scan_players,
+    get_match_page,
+    compute_champion_pool,
     compute_filtered_analysis,
+    build_analysis_grid,
     get_per_minute_comparison,
+    refresh_ddragon_version,
     PlayerProfile,
     MatchSummary,
     ChampionStats,
     FilteredAnalysis,
+    AnalysisGrid,
     PerMinuteSnapshot,
 )
\ No newline at end of file
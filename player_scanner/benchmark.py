@@ -1,59 +1,261 @@
 import sys
 import os
+import asyncio
+import logging
+import time
+from collections import Counter, defaultdict
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from db.client import get_session
+from backend.metrics import BENCHMARK_QUERY_SECONDS, register_cache
+from db.client import (
+    get_benchmark_sketches,
+    get_dataset_version,
+    get_rollup_snapshots,
+    get_session,
+    upsert_benchmark_sketches,
+)
+from player_scanner.cache import LRUCache
+from player_scanner.singleflight import SingleFlight
+from player_scanner.sketch import TDigest
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
+logger = logging.getLogger(__name__)
 
 _VALID_RANKS = frozenset({'CHALLENGER', 'GRANDMASTER', 'MASTER'})
+_ROLES = ("TOP", "JUNGLE", "MIDDLE", "BOTTOM", "UTILITY")
+_METRICS = ("cs", "gold", "xp", "level", "kills", "deaths", "assists")
+
+# Benchmarks only change when the pipeline finishes a run and publishes a new
+# dataset_version. Results are cached under the version they were read at and
+# reused until it changes; refresh_benchmarks() polls it and, on a new version,
+# pre-populates WARM_QUERIES and the most requested filters before switching,
+# so requests never see a cold cache. Each version also lists the retained
+# patches, newest first, which "last N patches" filters resolve against.
+_results = LRUCache(max_entries=int(os.getenv("BENCHMARK_CACHE_SIZE", "2048")))
+_distributions = LRUCache(max_entries=int(os.getenv("BENCHMARK_CACHE_SIZE", "2048")))
+_inflight = SingleFlight()
+register_cache("benchmark", _results)
+register_cache("benchmark_distribution", _distributions)
+
+_version: int | None = None
+_patches: list[str] = []
+_version_loaded = False
+# Requests per (role, champion, ranks, patches) filter, across versions.
+# Champion is free text, so once _DEMAND_MAX filters are tracked the counter
+# is trimmed back to the _WARM_HOTTEST most requested.
+_demand: Counter[tuple] = Counter()
+_WARM_HOTTEST = int(os.getenv("BENCHMARK_WARM_HOTTEST", "50"))
+_DEMAND_MAX = 1000
+# Matches whose snapshots refresh_benchmark_sketches() digests at a time
+_SKETCH_CHUNK = 2000
+
+# (role, champion, ranks, patches) — no filter, then each role, all tiers and patches
+WARM_QUERIES: list[tuple[str | None, str | None, list[str] | None, int | None]] = [
+    (None, None, None, None),
+    *((role, None, None, None) for role in _ROLES),
+]
+
+
+def _selected_ranks(ranks: list[str] | None) -> tuple[str, ...]:
+    return tuple(sorted(r for r in (ranks or _VALID_RANKS) if r in _VALID_RANKS)) or tuple(sorted(_VALID_RANKS))
+
+
+def _key(role: str | None, champion: str | None, ranks: tuple[str, ...], patches: int | None) -> tuple:
+    return (role.upper() if role else None, champion.lower() if champion else None, ranks, patches)
+
+
+def _versioned(version: int | None, available: list[str], key: tuple) -> tuple:
+    """Cache key for `key` at `version`: the patch count is resolved to the
+    newest `patches` of that version's `available` ones (None = all)."""
+    role, champion, ranks, patches = key
+    # Before any patch list is published, "last N" can only mean all of them
+    window = tuple(available[:patches]) if patches and available else None
+    return (version, role, champion, ranks, window)
+
+
+def _count_demand(key: tuple):
+    global _demand
+    _demand[key] += 1
+    if len(_demand) > _DEMAND_MAX:
+        _demand = Counter(dict(_demand.most_common(_WARM_HOTTEST)))
 
 
 async def get_benchmark(
     role: str | None = None,
     champion: str | None = None,
     ranks: list[str] | None = None,
+    patches: int | None = None,
 ) -> dict[int, dict]:
     """
-    Query Neon for per-minute averages filtered by rank tier, role, and/or champion.
+    Per-minute averages filtered by rank tier, role, and/or champion, read
+    from the pre-aggregated benchmark_rollup table.
     ranks defaults to all three tiers; pass a subset to compare against e.g. Challenger only.
+    patches limits it to the newest N retained patches (default: all of them).
+    Results are cached in-process per dataset version; concurrent misses for
+    the same filter share one query.
     """
-    selected = [r for r in (ranks or _VALID_RANKS) if r in _VALID_RANKS] or list(_VALID_RANKS)
-    # Values are validated against a whitelist — safe to interpolate
-    rank_sql = ', '.join(f"'{r}'" for r in selected)
-    conditions = [f"pl.rank IN ({rank_sql})"]
-    params: dict = {}
+    key = _key(role, champion, _selected_ranks(ranks), patches)
+    _count_demand(key)
+    versioned = _versioned(_version, _patches, key)
+    cached = _results.get(versioned)
+    if cached is not None:
+        return cached
+    return await _inflight.do(versioned, _query_and_cache, versioned)
 
-    if role:
-        conditions.append("UPPER(p.role) = UPPER(:role)")
-        params["role"] = role
-    if champion:
-        conditions.append("LOWER(p.champion) = LOWER(:champion)")
-        params["champion"] = champion
 
-    where = " AND ".join(conditions)
+async def _query_and_cache(versioned: tuple) -> dict[int, dict]:
+    result = await _query_benchmark(*versioned[1:])
+    _results.set(versioned, result)
+    return result
 
-    query = text(f"""
+
+async def get_benchmark_distribution(
+    role: str | None = None,
+    champion: str | None = None,
+    ranks: list[str] | None = None,
+    patches: int | None = None,
+) -> dict[int, dict[str, TDigest]]:
+    """
+    Per-minute t-digest of each metric for the same filters as get_benchmark(),
+    merged across the selected rank tiers and patches from benchmark_sketches.
+    A player's percentile position is digest.cdf(value). Cached the same way.
+    """
+    versioned = _versioned(_version, _patches, _key(role, champion, _selected_ranks(ranks), patches))
+    cached = _distributions.get(versioned)
+    if cached is not None:
+        return cached
+    return await _inflight.do(("distribution", *versioned), _query_distribution_and_cache, versioned)
+
+
+async def _query_distribution_and_cache(versioned: tuple) -> dict[int, dict[str, TDigest]]:
+    result = await _query_distribution(*versioned[1:])
+    _distributions.set(versioned, result)
+    return result
+
+
+def hottest(n: int = _WARM_HOTTEST) -> list[tuple[str | None, str | None, list[str], int | None]]:
+    """The n most requested (role, champion, ranks, patches) filters since startup."""
+    return [
+        (role, champion, list(ranks), patches)
+        for (role, champion, ranks, patches), _ in _demand.most_common(n)
+    ]
+
+
+async def warm_benchmarks(queries=None, version: int | None = None, patches: list[str] | None = None):
+    """Run `queries` (default: WARM_QUERIES plus the hottest filters) against
+    the database and cache their results under `version` and its retained
+    `patches` (default: the current ones). Failures are logged and leave the
+    previous results in place."""
+    if queries is None:
+        queries = [*WARM_QUERIES, *hottest()]
+    if version is None:
+        version, patches = _version, _patches
+
+    async def _warm(key: tuple):
+        versioned = _versioned(version, patches or [], key)
+        try:
+            await asyncio.gather(
+                _inflight.do(versioned, _query_and_cache, versioned),
+                _inflight.do(("distribution", *versioned), _query_distribution_and_cache, versioned),
+            )
+        except Exception as e:
+            logger.warning("Benchmark warm-up failed for %s: %s", key, e)
+
+    keys = {_key(role, champion, _selected_ranks(ranks), n) for role, champion, ranks, n in queries}
+    await asyncio.gather(*[_warm(key) for key in keys])
+
+
+async def refresh_benchmarks() -> bool:
+    """
+    Re-read the dataset version the pipeline publishes. On a new version,
+    pre-populate the warm and hottest filters under it, switch to it and drop
+    the previous version's entries. Returns whether the version changed.
+    """
+    global _version, _patches, _version_loaded
+    try:
+        async with get_session() as db:
+            version, patches = await get_dataset_version(db) or (None, [])
+    except Exception as e:
+        logger.warning("Benchmark dataset version check failed: %s", e)
+        return False
+    if _version_loaded and version == _version:
+        return False
+
+    await warm_benchmarks(version=version, patches=patches)
+    _version, _patches, _version_loaded = version, patches, True
+    for cache in (_results, _distributions):
+        for key in cache.keys():
+            if key[0] != version:
+                cache.pop(key)
+    return True
+
+
+def benchmark_cache_stats() -> dict:
+    """Dataset version, hit/miss counters for both caches, and the most requested filters."""
+    return {
+        "dataset_version": _version,
+        "patches":         _patches,
+        "results":         _results.stats(),
+        "distributions":   _distributions.stats(),
+        "hottest": [
+            {"role": role, "champion": champion, "ranks": list(ranks), "patches": patches, "requests": count}
+            for (role, champion, ranks, patches), count in _demand.most_common(10)
+        ],
+    }
+
+
+def _benchmark_sql(selected: tuple[str, ...], window: tuple[str, ...] | None = None):
+    # Reads the pipeline's benchmark_rollup (db/migrations): one row per patch,
+    # rank and minute for any filter, since unfiltered role/champion are stored as '*'.
+    # Ranks are validated against a whitelist — safe to interpolate
+    rank_sql = ', '.join(f"'{r}'" for r in selected)
+    patch_sql = " AND patch = ANY(:patches)" if window is not None else ""
+    averages = ",\n            ".join(
+        f"SUM(sum_{m})::float8 / NULLIF(SUM(n_{m}), 0) AS avg_{m}" for m in _METRICS
+    )
+    return text(f"""
         SELECT
-            ts.timestamp_minute,
-            AVG(ts.cs)      AS avg_cs,
-            AVG(ts.gold)    AS avg_gold,
-            AVG(ts.xp)      AS avg_xp,
-            AVG(ts.level)   AS avg_level,
-            AVG(ts.kills)   AS avg_kills,
-            AVG(ts.deaths)  AS avg_deaths,
-            AVG(ts.assists) AS avg_assists
-        FROM timeline_snapshots ts
-        JOIN participants p ON ts.match_id = p.match_id AND ts.puuid = p.puuid
-        JOIN players     pl ON ts.puuid = pl.puuid
-        WHERE {where}
-        GROUP BY ts.timestamp_minute
-        ORDER BY ts.timestamp_minute
+            timestamp_minute,
+            {averages}
+        FROM benchmark_rollup
+        WHERE rank IN ({rank_sql}) AND role = :role AND champion = :champion{patch_sql}
+        GROUP BY timestamp_minute
+        ORDER BY timestamp_minute
     """)
 
+
+def _distribution_sql(selected: tuple[str, ...], window: tuple[str, ...] | None = None):
+    rank_sql = ', '.join(f"'{r}'" for r in selected)
+    patch_sql = " AND patch = ANY(:patches)" if window is not None else ""
+    return text(f"""
+        SELECT timestamp_minute, metric, sketch
+        FROM benchmark_sketches
+        WHERE rank IN ({rank_sql}) AND role = :role AND champion = :champion{patch_sql}
+    """)
+
+
+def _filter_params(role: str | None, champion: str | None, window: tuple[str, ...] | None = None) -> dict:
+    params = {
+        "role":     role.upper() if role else "*",
+        "champion": champion.lower() if champion else "*",
+    }
+    if window is not None:
+        params["patches"] = list(window)
+    return params
+
+
+async def _query_benchmark(
+    role: str | None,
+    champion: str | None,
+    selected: tuple[str, ...],
+    window: tuple[str, ...] | None = None,
+) -> dict[int, dict]:
+    started = time.perf_counter()
     async with get_session() as db:
-        result = await db.execute(query, params)
+        result = await db.execute(_benchmark_sql(selected, window), _filter_params(role, champion, window))
         rows = result.fetchall()
+    BENCHMARK_QUERY_SECONDS.observe(time.perf_counter() - started)
 
     return {
         row[0]: {
@@ -66,4 +268,73 @@ async def get_benchmark(
             "assists": round(float(row[7]), 2) if row[7] is not None else None,
         }
         for row in rows
-    }
\ No newline at end of file
+    }
+
+
+async def _query_distribution(
+    role: str | None,
+    champion: str | None,
+    selected: tuple[str, ...],
+    window: tuple[str, ...] | None = None,
+) -> dict[int, dict[str, TDigest]]:
+    started = time.perf_counter()
+    async with get_session() as db:
+        result = await db.execute(_distribution_sql(selected, window), _filter_params(role, champion, window))
+        rows = result.fetchall()
+    BENCHMARK_QUERY_SECONDS.observe(time.perf_counter() - started)
+
+    # One sketch per rank and patch for each (minute, metric) — pooled in one pass
+    pooled: dict[tuple[int, str], list[TDigest]] = defaultdict(list)
+    for minute, metric, sketch in rows:
+        pooled[(minute, metric)].append(TDigest.from_bytes(bytes(sketch)))
+    merged: dict[int, dict[str, TDigest]] = defaultdict(dict)
+    for (minute, metric), digests in pooled.items():
+        merged[minute][metric] = TDigest.merge_all(digests)
+    return dict(merged)
+
+
+async def refresh_benchmark_sketches(session: AsyncSession, matches: list[tuple[str, str]]) -> int:
+    """
+    Add the snapshots of `matches`, (patch, match_id) pairs that
+    refresh_benchmark_rollup() just folded in, to benchmark_sketches: build a
+    digest per key, including the role/champion '*' wildcards, merge it into
+    the stored one and write it back. Returns how many sketches were written.
+
+    Run it in the rollup's session so both commit together — otherwise a
+    failure here would leave matches in the rollup ledger that are never
+    sketched. Matches are digested _SKETCH_CHUNK at a time, so a first-run
+    backfill never holds more than one chunk of snapshots.
+    """
+    # Sketch keys start with the patch, so patch-ordered chunks rewrite fewer of them
+    matches = sorted(matches)
+    written: set[tuple] = set()
+    for start in range(0, len(matches), _SKETCH_CHUNK):
+        rows = await get_rollup_snapshots(session, matches[start:start + _SKETCH_CHUNK], sorted(_VALID_RANKS))
+
+        digests: dict[tuple, TDigest] = {}
+        for patch, rank, role, champion, minute, *stats in rows:
+            for r, c in ((role, champion), (role, "*"), ("*", champion), ("*", "*")):
+                for metric, value in zip(_METRICS, stats):
+                    if value is None:
+                        continue
+                    key = (patch, rank, r, c, minute, metric)
+                    digest = digests.get(key)
+                    if digest is None:
+                        digest = digests[key] = TDigest()
+                    digest.add(value)
+        if not digests:
+            continue
+
+        stored = await get_benchmark_sketches(session, list(digests))
+        updated = []
+        for key, digest in digests.items():
+            if key in stored:
+                digest.merge(TDigest.from_bytes(stored[key]))
+            patch, rank, role, champion, minute, metric = key
+            updated.append({
+                "patch": patch, "rank": rank, "role": role, "champion": champion,
+                "timestamp_minute": minute, "metric": metric, "sketch": digest.to_bytes(),
+            })
+        await upsert_benchmark_sketches(session, updated)
+        written.update(digests)
+    return len(written)
@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Bounded in-memory mapping with least-recently-used eviction and an
+    optional per-entry time-to-live (seconds).
+
+    Besides the entry cap, a byte budget can be set: `sizeof(value)` gives
+    each entry's estimated size and the least recently used entries are
+    evicted until the total fits. Expired entries are dropped on access, and
+    sweep() removes the rest — call it periodically so entries that are
+    never looked up again don't sit in memory until they are evicted.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+        sizeof: Callable[[Any], int] | None = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data: OrderedDict[Hashable, tuple[Any, float | None, int]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and not self._expired(entry, time.monotonic())
+
+    @staticmethod
+    def _expired(entry: tuple, now: float) -> bool:
+        return entry[1] is not None and now >= entry[1]
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if self._expired(entry, time.monotonic()):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """Store `value`; `ttl` overrides the cache-wide TTL for this entry."""
+        ttl = ttl if ttl is not None else self.ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, expires, size)
+        self._bytes += size
+        while len(self._data) > self.max_entries or (
+            self.max_bytes is not None and self._bytes > self.max_bytes and len(self._data) > 1
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def keys(self) -> list[Hashable]:
+        """Snapshot of the stored keys, least recently used first."""
+        return list(self._data)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self._data:
+            return default
+        value = self._data[key][0]
+        self._remove(key)
+        return value
+
+    def clear(self):
+        self._data.clear()
+        self._bytes = 0
+
+    def sweep(self) -> int:
+        """Drop every expired entry. Returns how many were removed."""
+        now = time.monotonic()
+        expired = [k for k, entry in self._data.items() if self._expired(entry, now)]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries":     len(self._data),
+            "bytes":       self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes":   self.max_bytes,
+            "hits":        self.hits,
+            "misses":      self.misses,
+            "hit_ratio":   round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions":   self.evictions,
+            "expirations": self.expirations,
+        }
@@ -1,21 +1,29 @@
 import asyncio
-import aiohttp
 import os
 import sys
+import time
+from array import array
 from collections import defaultdict
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable
 
 from dotenv import load_dotenv
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
-from backend.fetch_functions.timeline_fetch import extract_snapshots
+from backend.fetch_functions.ddragon_store import ddragon_store
+from backend.fetch_functions.match_store import MATCH, TIMELINE, match_store
+from backend.fetch_functions.riot_client import RiotClient
+from backend.fetch_functions.timeline_fetch import extract_snapshots, load_timeline
+from backend.metrics import cpu_timed, register_cache
 
 _EVERY_MINUTE = set(range(1, 41))   # 1–40 min for on-demand player analysis
-from player_scanner.benchmark import get_benchmark
+from player_scanner.benchmark import get_benchmark, get_benchmark_distribution
+from player_scanner.cache import LRUCache
+from player_scanner.singleflight import SingleFlight
 
 load_dotenv()
-KEY = os.getenv("API_KEY")
 
 PLATFORM_TO_CONTINENT = {
     "na1": "americas", "br1": "americas", "la1": "americas", "la2": "americas",
@@ -24,7 +32,29 @@ PLATFORM_TO_CONTINENT = {
     "oc1": "sea",
 }
 
-_sem = asyncio.Semaphore(15)
+_MAX_CONCURRENCY = 15
+
+# Concurrent scans that need the same match/timeline share one fetch
+_inflight = SingleFlight()
+
+_HISTORY_SIZE = 100   # ranked games kept per player
+_PAGE_SIZE    = int(os.getenv("MATCH_PAGE_SIZE", "20"))   # match details fetched per page
+
+# puuid -> _History. The newest parsed game's start time is the watermark for
+# the next refresh, so a returning player only costs the match-id call plus
+# one call per new game on the first page.
+_history = LRUCache(max_entries=int(os.getenv("HISTORY_CACHE_PLAYERS", "5000")))
+
+# (match_id, puuid) -> that player's per-minute series for the match, so
+# changing the role/champion filter on /timeline is pure in-memory aggregation.
+_SERIES_FIELDS = ("cs", "gold", "xp", "level", "kills", "deaths", "assists")
+_series = LRUCache(
+    max_entries=int(os.getenv("TIMELINE_SERIES_CACHE_SIZE", "20000")),   # ~1 KB each
+    ttl=float(os.getenv("TIMELINE_SERIES_TTL_SECONDS", str(6 * 3600))),
+)
+
+register_cache("match_history", _history)
+register_cache("timeline_series", _series)
 
 
 # ---------------------------------------------------------------------------
@@ -105,67 +135,106 @@ class PerMinuteSnapshot:
     benchmark_kills: float | None
     benchmark_deaths: float | None
     benchmark_assists: float | None
+    # Where the player's value falls in the benchmark distribution, 0-100
+    percentile_cs: float | None = None
+    percentile_gold: float | None = None
+    percentile_xp: float | None = None
+    percentile_level: float | None = None
+    percentile_kills: float | None = None
+    percentile_deaths: float | None = None
+    percentile_assists: float | None = None
 
 
 # ---------------------------------------------------------------------------
 # Riot API helpers
 # ---------------------------------------------------------------------------
 
-async def _get(http: aiohttp.ClientSession, url: str) -> dict | list | None:
-    async with _sem:
-        while True:
-            async with http.get(url, headers={"X-Riot-Token": KEY}) as r:
-                if r.status == 200:
-                    return await r.json()
-                if r.status == 429:
-                    wait = int(r.headers.get("Retry-After", 1))
-                    await asyncio.sleep(wait)
-                    continue
-                return None
+@asynccontextmanager
+async def _client(riot: RiotClient | None):
+    """Use the caller's shared client, or open a short-lived one for this call."""
+    if riot is not None:
+        yield riot
+        return
+    async with RiotClient(max_concurrency=_MAX_CONCURRENCY) as own:
+        yield own
+
+
+async def _get(riot: RiotClient, url: str) -> dict | list | None:
+    return await riot.get(url)
+
+
+# Latest DDragon version, checked at most every _DDRAGON_TTL seconds. The API
+# preloads it at startup and refreshes it in the background, so scans
+# normally never wait on DDragon.
+_DDRAGON_TTL = float(os.getenv("DDRAGON_VERSION_TTL_SECONDS", "3600"))
+_DDRAGON_FALLBACK = "15.1.1"
+_ddragon_version: str | None = None
+_ddragon_checked = 0.0
+
+
+async def _latest_ddragon_version(riot: RiotClient) -> str:
+    if _ddragon_version is None or time.monotonic() - _ddragon_checked > _DDRAGON_TTL:
+        await _inflight.do("ddragon-version", refresh_ddragon_version, riot)
+    return _ddragon_version or _DDRAGON_FALLBACK
 
 
-async def _latest_ddragon_version(http: aiohttp.ClientSession) -> str:
-    async with http.get("https://ddragon.leagueoflegends.com/api/versions.json") as r:
-        versions = await r.json() if r.status == 200 else []
-        return versions[0] if versions else "15.1.1"
+async def refresh_ddragon_version(riot: RiotClient) -> str:
+    """Re-read the latest DDragon version through the local DDragon store.
+    If neither DDragon nor the store has one, the previous value is kept."""
+    global _ddragon_version, _ddragon_checked
+    versions = await ddragon_store.versions(riot.session)
+    if versions:
+        _ddragon_version = versions[0]
+    _ddragon_checked = time.monotonic()
+    return _ddragon_version or _DDRAGON_FALLBACK
 
 
-async def _fetch_account(http, game_name: str, tag_line: str, platform: str) -> dict | None:
+async def _fetch_account(riot, game_name: str, tag_line: str, platform: str) -> dict | None:
     continent = PLATFORM_TO_CONTINENT.get(platform.lower(), "americas")
-    return await _get(http, f"https://{continent}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}")
+    return await _get(riot, f"https://{continent}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}")
 
 
-async def _fetch_summoner(http, puuid: str, platform: str) -> dict | None:
-    return await _get(http, f"https://{platform}.api.riotgames.com/lol/summoner/v4/summoners/by-puuid/{puuid}")
+async def _fetch_summoner(riot, puuid: str, platform: str) -> dict | None:
+    return await _get(riot, f"https://{platform}.api.riotgames.com/lol/summoner/v4/summoners/by-puuid/{puuid}")
 
 
-async def _fetch_rank(http, puuid: str, platform: str) -> dict | None:
-    data = await _get(http, f"https://{platform}.api.riotgames.com/lol/league/v4/entries/by-puuid/{puuid}")
+async def _fetch_rank(riot, puuid: str, platform: str) -> dict | None:
+    data = await _get(riot, f"https://{platform}.api.riotgames.com/lol/league/v4/entries/by-puuid/{puuid}")
     if not data:
         return None
     return next((e for e in data if e.get("queueType") == "RANKED_SOLO_5x5"), None)
 
 
-async def _fetch_match_ids(http, puuid: str, platform: str, count: int = 100) -> list[str]:
+async def _fetch_match_ids(
+    riot, puuid: str, platform: str, count: int = _HISTORY_SIZE, start_time: int | None = None,
+) -> list[str]:
     continent = PLATFORM_TO_CONTINENT.get(platform.lower(), "americas")
-    data = await _get(http, f"https://{continent}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&count={count}")
+    url = f"https://{continent}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&count={count}"
+    if start_time is not None:
+        url += f"&startTime={start_time}"
+    data = await _get(riot, url)
     return data if isinstance(data, list) else []
 
 
-async def _fetch_match(http, match_id: str, platform: str) -> dict | None:
+async def _fetch_match(riot, match_id: str, platform: str) -> dict | None:
     continent = PLATFORM_TO_CONTINENT.get(platform.lower(), "americas")
-    return await _get(http, f"https://{continent}.api.riotgames.com/lol/match/v5/matches/{match_id}")
+    url = f"https://{continent}.api.riotgames.com/lol/match/v5/matches/{match_id}"
+    return await _inflight.do((MATCH, match_id), match_store.fetch, riot, url, match_id, MATCH)
 
 
-async def _fetch_timeline(http, match_id: str, platform: str) -> dict | None:
+async def _fetch_timeline(riot, match_id: str, platform: str) -> dict | None:
     continent = PLATFORM_TO_CONTINENT.get(platform.lower(), "americas")
-    return await _get(http, f"https://{continent}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline")
+    url = f"https://{continent}.api.riotgames.com/lol/match/v5/matches/{match_id}/timeline"
+    return await _inflight.do(
+        (TIMELINE, match_id), match_store.fetch, riot, url, match_id, TIMELINE, loads=load_timeline,
+    )
 
 
 # ---------------------------------------------------------------------------
 # Parsing
 # ---------------------------------------------------------------------------
 
+@cpu_timed("parse_match_summary")
 def _parse_match_summary(raw: dict, puuid: str) -> MatchSummary | None:
     info = raw.get("info", {})
     for p in info.get("participants", []):
@@ -191,6 +260,52 @@ def _parse_match_summary(raw: dict, puuid: str) -> MatchSummary | None:
     return None
 
 
+def _player_series(timeline: dict, match_id: str, puuid: str) -> array:
+    """
+    One player's per-minute stats as a flat int array: minute m's _SERIES_FIELDS
+    sit at [(m - 1) * n : m * n]. Minutes without a frame are marked -1.
+    """
+    n = len(_SERIES_FIELDS)
+    series = array("i", [-1]) * (max(_EVERY_MINUTE) * n)
+    last = 0
+    for s in extract_snapshots(timeline, match_id, minutes=_EVERY_MINUTE):
+        if s["puuid"] != puuid:
+            continue
+        t = s["timestamp_minute"]
+        series[(t - 1) * n:t * n] = array("i", [s.get(k) or 0 for k in _SERIES_FIELDS])
+        last = max(last, t)
+    del series[last * n:]
+    return series
+
+
+async def _fetch_series(riot, match_id: str, puuid: str, platform: str) -> array | None:
+    """Fetch one timeline and reduce it to the player's series straight away, so
+    at most a handful of (pruned) timeline trees are alive at any moment."""
+    timeline = await _fetch_timeline(riot, match_id, platform)
+    if not timeline:
+        return None
+    series = _player_series(timeline, match_id, puuid)
+    _series.set((match_id, puuid), series)
+    return series
+
+
+def _build_profile(account: dict, summoner: dict, ddragon_version: str, rank_data: dict | None) -> PlayerProfile:
+    icon_id = summoner.get("profileIconId", 0)
+    total_games = (rank_data["wins"] + rank_data["losses"]) if rank_data else 0
+    return PlayerProfile(
+        puuid=account["puuid"],
+        game_name=account["gameName"],
+        tag_line=account["tagLine"],
+        summoner_level=summoner.get("summonerLevel", 0),
+        profile_icon_url=f"https://ddragon.leagueoflegends.com/cdn/{ddragon_version}/img/profileicon/{icon_id}.png",
+        rank=f"{rank_data['tier']} {rank_data['rank']}" if rank_data else "Unranked",
+        lp=rank_data.get("leaguePoints", 0) if rank_data else 0,
+        wins=rank_data.get("wins", 0) if rank_data else 0,
+        losses=rank_data.get("losses", 0) if rank_data else 0,
+        winrate=rank_data["wins"] / total_games if total_games > 0 else 0.0,
+    )
+
+
 def _build_champion_pool(matches: list[MatchSummary]) -> list[ChampionStats]:
     stats: dict = defaultdict(lambda: {"games": 0, "wins": 0, "kills": 0, "deaths": 0, "assists": 0})
     for m in matches:
@@ -214,60 +329,330 @@ def _build_champion_pool(matches: list[MatchSummary]) -> list[ChampionStats]:
     ], key=lambda x: x.games, reverse=True)
 
 
+@dataclass
+class _History:
+    """
+    A player's last _HISTORY_SIZE ranked match IDs, newest first, and the
+    summaries parsed so far. Details are only fetched a page at a time, so
+    `parsed` usually covers just the first page or two.
+    """
+    match_ids: list[str]
+    parsed: dict[str, MatchSummary]
+
+    def watermark(self) -> int | None:
+        for mid in self.match_ids:
+            if mid in self.parsed:
+                return int(self.parsed[mid].game_timestamp.timestamp())
+        return None
+
+    def merge_ids(self, fetched: list[str], watermark: int | None):
+        """Fold in the IDs returned for `watermark` (all at or after it)."""
+        if watermark is None:
+            ids = fetched[:_HISTORY_SIZE]
+        else:
+            known = set(self.match_ids)
+            ids = ([mid for mid in fetched if mid not in known] + self.match_ids)[:_HISTORY_SIZE]
+        self.match_ids = ids
+        self.parsed = {mid: self.parsed[mid] for mid in ids if mid in self.parsed}
+
+    def matches(self, ids: list[str]) -> list[MatchSummary]:
+        return [self.parsed[mid] for mid in ids if mid in self.parsed]
+
+
+def _history_for(puuid: str) -> _History:
+    history = _history.get(puuid)
+    if history is None:
+        history = _History(match_ids=[], parsed={})
+        _history.set(puuid, history)
+    return history
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
-async def scan_player(game_name: str, tag_line: str, platform: str = "na1") -> dict:
+async def scan_player_stream(
+    game_name: str,
+    tag_line: str,
+    platform: str = "na1",
+    riot: RiotClient | None = None,
+) -> AsyncIterator[tuple[str, Any]]:
     """
-    Fetch a player's full profile, last 100 ranked matches, and champion pool.
-    All data is fetched on-demand from Riot API — nothing stored in DB.
+    Scan a player progressively, yielding (event, payload) as data arrives:
+
+        ("profile", PlayerProfile)          after the account + summoner/rank round trip
+        ("match_ids", [str])                the last 100 ranked match IDs, newest first
+        ("match", MatchSummary)             once per game on the first page — already-parsed
+                                            games first, then the rest as each fetch finishes
+        ("champion_pool", [ChampionStats])  last, over the first page
+        ("error", str)                      instead of the above if the player can't be found
+
+    Matches are not emitted in date order; sort by game_timestamp. Later
+    pages are loaded on demand with get_match_page().
     """
-    async with aiohttp.ClientSession() as http:
-        account = await _fetch_account(http, game_name, tag_line, platform)
+    async with _client(riot) as riot:
+        account = await _fetch_account(riot, game_name, tag_line, platform)
         if not account:
-            return {"error": f"Player '{game_name}#{tag_line}' not found."}
+            yield "error", f"Player '{game_name}#{tag_line}' not found."
+            return
 
         puuid = account["puuid"]
 
-        # All four fetches in parallel — rank now uses PUUID directly
-        summoner, match_ids, ddragon_version, rank_data = await asyncio.gather(
-            _fetch_summoner(http, puuid, platform),
-            _fetch_match_ids(http, puuid, platform),
-            _latest_ddragon_version(http),
-            _fetch_rank(http, puuid, platform),
-        )
+        # Only ask for games at or after the newest one we've already parsed
+        history = _history_for(puuid)
+        watermark = history.watermark()
+
+        # All four fetches in parallel — rank now uses PUUID directly. The
+        # profile doesn't need the match IDs, so it goes out without them.
+        ids_task = asyncio.create_task(_fetch_match_ids(riot, puuid, platform, start_time=watermark))
+        fetches: list[asyncio.Task] = []
+        try:
+            summoner, ddragon_version, rank_data = await asyncio.gather(
+                _fetch_summoner(riot, puuid, platform),
+                _latest_ddragon_version(riot),
+                _fetch_rank(riot, puuid, platform),
+            )
+
+            if not summoner:
+                yield "error", "Could not fetch summoner data."
+                return
+
+            yield "profile", _build_profile(account, summoner, ddragon_version, rank_data)
+
+            history.merge_ids(await ids_task, watermark)
+            yield "match_ids", list(history.match_ids)
+
+            page = history.match_ids[:_PAGE_SIZE]
+            for m in history.matches(page):
+                yield "match", m
+
+            # Fetch only first-page games we haven't parsed yet, in parallel
+            missing = [mid for mid in page if mid not in history.parsed]
+            fetches = [asyncio.create_task(_fetch_match(riot, mid, platform)) for mid in missing]
+            for done in asyncio.as_completed(fetches):
+                raw = await done
+                m = _parse_match_summary(raw, puuid) if raw else None
+                if m:
+                    history.parsed[m.match_id] = m
+                    yield "match", m
+        finally:
+            # The consumer may stop early (client disconnected)
+            for task in [ids_task, *fetches]:
+                task.cancel()
+
+        yield "champion_pool", _build_champion_pool(history.matches(page))
+
+
+async def scan_player(
+    game_name: str,
+    tag_line: str,
+    platform: str = "na1",
+    riot: RiotClient | None = None,
+    on_event: Callable[[str, Any], None] | None = None,
+) -> dict:
+    """
+    Fetch a player's profile, last 100 ranked match IDs, the first page of
+    match details, and the champion pool over that page.
+    All data is fetched on-demand from Riot API — nothing stored in DB.
+    Repeat scans of the same player only fetch games newer than the last scan.
+    Pass a shared RiotClient to reuse its connection pool across calls.
+    on_event receives each scan_player_stream() event as it arrives.
+    """
+    result: dict = {"recent_matches": []}
+    async for event, payload in scan_player_stream(game_name, tag_line, platform, riot=riot):
+        if on_event is not None:
+            on_event(event, payload)
+        if event == "error":
+            return {"error": payload}
+        if event == "match":
+            result["recent_matches"].append(payload)
+        else:
+            result[event] = payload
+    result["recent_matches"].sort(key=lambda m: m.game_timestamp, reverse=True)
+    return result
+
+
+async def scan_players(
+    riot_ids: list[tuple[str, str]],
+    platform: str = "na1",
+    riot: RiotClient | None = None,
+) -> list[dict]:
+    """
+    scan_player for many players at once, e.g. a whole lobby or team roster.
+
+    Players in the same lobby share most of their recent games, so match IDs
+    are collected across all players first and each unique match is fetched
+    once; every player's row is then split back out of the shared payload.
+    Returns one scan_player-shaped dict per (game_name, tag_line), in order.
+    """
+    async with _client(riot) as riot:
+        accounts = await asyncio.gather(*[_fetch_account(riot, g, t, platform) for g, t in riot_ids])
+        found = [a for a in accounts if a]
+        ddragon_version = await _latest_ddragon_version(riot)
+
+        async def _player(account: dict):
+            puuid = account["puuid"]
+            history = _history_for(puuid)
+            watermark = history.watermark()
+            summoner, rank_data, match_ids = await asyncio.gather(
+                _fetch_summoner(riot, puuid, platform),
+                _fetch_rank(riot, puuid, platform),
+                _fetch_match_ids(riot, puuid, platform, start_time=watermark),
+            )
+            history.merge_ids(match_ids, watermark)
+            return summoner, rank_data, history
+
+        players = await asyncio.gather(*[_player(a) for a in found])
+
+        # Each unique first-page match once, however many of the players were in it
+        unique_ids = list(dict.fromkeys(
+            mid for *_, history in players for mid in history.match_ids[:_PAGE_SIZE] if mid not in history.parsed
+        ))
+        raws = dict(zip(unique_ids, await asyncio.gather(*[_fetch_match(riot, mid, platform) for mid in unique_ids])))
 
+    scans: dict[str, dict] = {}
+    for account, (summoner, rank_data, history) in zip(found, players):
+        puuid = account["puuid"]
         if not summoner:
-            return {"error": "Could not fetch summoner data."}
-
-        # Build profile
-        icon_id = summoner.get("profileIconId", 0)
-        total_games = (rank_data["wins"] + rank_data["losses"]) if rank_data else 0
-        profile = PlayerProfile(
-            puuid=puuid,
-            game_name=account["gameName"],
-            tag_line=account["tagLine"],
-            summoner_level=summoner.get("summonerLevel", 0),
-            profile_icon_url=f"https://ddragon.leagueoflegends.com/cdn/{ddragon_version}/img/profileicon/{icon_id}.png",
-            rank=f"{rank_data['tier']} {rank_data['rank']}" if rank_data else "Unranked",
-            lp=rank_data.get("leaguePoints", 0) if rank_data else 0,
-            wins=rank_data.get("wins", 0) if rank_data else 0,
-            losses=rank_data.get("losses", 0) if rank_data else 0,
-            winrate=rank_data["wins"] / total_games if total_games > 0 else 0.0,
+            scans[puuid] = {"error": "Could not fetch summoner data."}
+            continue
+        page = history.match_ids[:_PAGE_SIZE]
+        for mid in page:
+            if mid not in history.parsed and raws.get(mid):
+                m = _parse_match_summary(raws[mid], puuid)
+                if m:
+                    history.parsed[mid] = m
+        matches = history.matches(page)
+        scans[puuid] = {
+            "profile": _build_profile(account, summoner, ddragon_version, rank_data),
+            "match_ids": list(history.match_ids),
+            "recent_matches": matches,
+            "champion_pool": _build_champion_pool(matches),
+        }
+
+    return [
+        scans[account["puuid"]] if account else {"error": f"Player '{g}#{t}' not found."}
+        for (g, t), account in zip(riot_ids, accounts)
+    ]
+
+
+async def get_match_page(
+    puuid: str,
+    match_ids: list[str],
+    platform: str = "na1",
+    offset: int = 0,
+    limit: int = _PAGE_SIZE,
+    riot: RiotClient | None = None,
+) -> list[MatchSummary]:
+    """
+    Summaries for match_ids[offset:offset + limit], newest first. Games parsed
+    by an earlier scan or page are reused; the rest are fetched now and kept
+    for the next request. `match_ids` is the list scan_player returned.
+    """
+    history = _history_for(puuid)
+    if not history.match_ids:
+        history.match_ids = list(match_ids)
+    page = match_ids[offset:offset + limit]
+    missing = [mid for mid in page if mid not in history.parsed]
+    if missing:
+        async with _client(riot) as riot:
+            raws = await asyncio.gather(*[_fetch_match(riot, mid, platform) for mid in missing])
+        for raw in raws:
+            m = _parse_match_summary(raw, puuid) if raw else None
+            if m:
+                history.parsed[m.match_id] = m
+    return history.matches(page)
+
+
+def compute_champion_pool(matches: list[MatchSummary]) -> list[ChampionStats]:
+    """Per-champion games, winrate and KDA averages, most played first."""
+    return _build_champion_pool(matches)
+
+
+class _Totals:
+    """Running sums behind one FilteredAnalysis."""
+    __slots__ = ("games", "wins", "kills", "deaths", "assists", "cs_per_min", "gold_per_min", "vision", "damage")
+
+    def __init__(self):
+        self.games = self.wins = self.kills = self.deaths = self.assists = self.vision = self.damage = 0
+        self.cs_per_min = self.gold_per_min = 0.0
+
+    def add(self, m: MatchSummary):
+        minutes = m.duration / 60
+        self.games += 1
+        self.wins += int(m.win)
+        self.kills += m.kills
+        self.deaths += m.deaths
+        self.assists += m.assists
+        self.cs_per_min += m.cs / minutes
+        self.gold_per_min += m.gold / minutes
+        self.vision += m.vision_score
+        self.damage += m.damage
+
+    def result(self) -> FilteredAnalysis:
+        n = self.games
+        return FilteredAnalysis(
+            games_analyzed=n,
+            winrate=self.wins / n,
+            avg_kills=self.kills / n,
+            avg_deaths=self.deaths / n,
+            avg_assists=self.assists / n,
+            avg_cs_per_min=self.cs_per_min / n,
+            avg_gold_per_min=self.gold_per_min / n,
+            avg_vision_score=self.vision / n,
+            avg_damage=self.damage / n,
         )
 
-        # Fetch all 20 matches in parallel
-        match_raws = await asyncio.gather(*[_fetch_match(http, mid, platform) for mid in match_ids])
-        matches = [m for raw in match_raws if raw for m in [_parse_match_summary(raw, puuid)] if m]
 
+def _grid_key(role: str | None, champion: str | None) -> tuple[str | None, str | None]:
+    return (role.upper() if role is not None else None, champion.lower() if champion is not None else None)
+
+
+@dataclass
+class AnalysisGrid:
+    """
+    FilteredAnalysis for every filter a match list supports — all games, each
+    role, each champion and each role+champion pair — built in one pass, so
+    answering a filter is a dict lookup. Keys are (ROLE, champion-lowercase),
+    with None meaning "any".
+    """
+    cells: dict[tuple[str | None, str | None], FilteredAnalysis]
+    champion_names: dict[str, str]     # lowercase -> display name
+
+    def get(self, role: str | None = None, champion: str | None = None) -> FilteredAnalysis | None:
+        return self.cells.get(_grid_key(role, champion))
+
+    def options(self) -> dict:
+        """Every role, champion and role+champion with at least one game, most played first."""
+        def games(key):
+            return self.cells[key].games_analyzed
+
+        roles = sorted((k for k in self.cells if k[0] is not None and k[1] is None), key=games, reverse=True)
+        champs = sorted((k for k in self.cells if k[0] is None and k[1] is not None), key=games, reverse=True)
+        pairs = sorted((k for k in self.cells if None not in k), key=games, reverse=True)
+        total = self.cells.get((None, None))
         return {
-            "profile": profile,
-            "recent_matches": matches,
-            "champion_pool": _build_champion_pool(matches),
+            "games":        total.games_analyzed if total else 0,
+            "roles":        [{"role": k[0], "games": games(k)} for k in roles],
+            "champions":    [{"champion": self.champion_names[k[1]], "games": games(k)} for k in champs],
+            "combinations": [
+                {"role": k[0], "champion": self.champion_names[k[1]], "games": games(k)} for k in pairs
+            ],
         }
 
 
+def build_analysis_grid(matches: list[MatchSummary]) -> AnalysisGrid:
+    """Aggregate `matches` under every role/champion filter at once."""
+    totals: dict[tuple[str | None, str | None], _Totals] = defaultdict(_Totals)
+    names: dict[str, str] = {}
+    for m in matches:
+        role, champ = _grid_key(m.role, m.champion)
+        names.setdefault(champ, m.champion)
+        for key in ((None, None), (role, None), (None, champ), (role, champ)):
+            totals[key].add(m)
+    return AnalysisGrid(cells={k: t.result() for k, t in totals.items()}, champion_names=names)
+
+
 def compute_filtered_analysis(
     matches: list[MatchSummary],
     role: str | None = None,
@@ -275,31 +660,15 @@ def compute_filtered_analysis(
 ) -> FilteredAnalysis | None:
     """
     Compute aggregate stats from a filtered subset of matches.
-    Call this after scan_player() to analyze a specific role/champion.
+    Call this after scan_player() to analyze a specific role/champion; for
+    repeated filters over the same matches, build_analysis_grid() is cheaper.
     """
-    filtered = [
-        m for m in matches
-        if (role is None or m.role.upper() == role.upper())
-        and (champion is None or m.champion.lower() == champion.lower())
-    ]
-    if not filtered:
-        return None
-
-    n = len(filtered)
-    wins = sum(1 for m in filtered if m.win)
-    durations = [m.duration / 60 for m in filtered]
-
-    return FilteredAnalysis(
-        games_analyzed=n,
-        winrate=wins / n,
-        avg_kills=sum(m.kills for m in filtered) / n,
-        avg_deaths=sum(m.deaths for m in filtered) / n,
-        avg_assists=sum(m.assists for m in filtered) / n,
-        avg_cs_per_min=sum(m.cs / d for m, d in zip(filtered, durations)) / n,
-        avg_gold_per_min=sum(m.gold / d for m, d in zip(filtered, durations)) / n,
-        avg_vision_score=sum(m.vision_score for m in filtered) / n,
-        avg_damage=sum(m.damage for m in filtered) / n,
-    )
+    want_role, want_champ = _grid_key(role, champion)
+    totals = _Totals()
+    for m in matches:
+        if (want_role is None or m.role.upper() == want_role) and (want_champ is None or m.champion.lower() == want_champ):
+            totals.add(m)
+    return totals.result() if totals.games else None
 
 
 async def get_per_minute_comparison(
@@ -309,10 +678,14 @@ async def get_per_minute_comparison(
     role: str | None = None,
     champion: str | None = None,
     ranks: list[str] | None = None,
+    riot: RiotClient | None = None,
+    patches: int | None = None,
 ) -> list[PerMinuteSnapshot]:
     """
     Fetch timelines for filtered matches, average the player's per-minute stats,
-    then query Neon for the Master+ benchmark and return a side-by-side comparison.
+    then query Neon for the Master+ benchmark and return a side-by-side comparison
+    with the player's percentile position in the benchmark distribution.
+    patches limits the benchmark to the newest N patches (default: all retained).
     """
     filtered = [
         m for m in matches
@@ -322,25 +695,38 @@ async def get_per_minute_comparison(
     if not filtered:
         return []
 
-    async with aiohttp.ClientSession() as http:
-        timelines = await asyncio.gather(*[_fetch_timeline(http, m.match_id, platform) for m in filtered])
+    # Timelines are only fetched and parsed for matches not already in the series cache
+    all_series = []
+    missing = []
+    for m in filtered:
+        series = _series.get((m.match_id, puuid))
+        if series is None:
+            missing.append(m)
+        else:
+            all_series.append(series)
+
+    if missing:
+        async with _client(riot) as riot:
+            fetched = await asyncio.gather(*[_fetch_series(riot, m.match_id, puuid, platform) for m in missing])
+        all_series.extend(s for s in fetched if s is not None)
 
     # Accumulate player stats across matches at each timestamp
-    sums: dict = defaultdict(lambda: {k: 0 for k in ("cs", "gold", "xp", "level", "kills", "deaths", "assists", "count")})
-    for timeline in timelines:
-        if not timeline:
-            continue
-        match_id = timeline["metadata"]["matchId"]
-        for s in extract_snapshots(timeline, match_id, minutes=_EVERY_MINUTE):
-            if s["puuid"] != puuid:
+    n_fields = len(_SERIES_FIELDS)
+    sums: dict = defaultdict(lambda: {k: 0 for k in (*_SERIES_FIELDS, "count")})
+    for series in all_series:
+        for i in range(0, len(series), n_fields):
+            if series[i] < 0:
                 continue
-            t = s["timestamp_minute"]
-            for key in ("cs", "gold", "xp", "level", "kills", "deaths", "assists"):
-                sums[t][key] += s.get(key) or 0
-            sums[t]["count"] += 1
-
-    # Fetch benchmark from Neon, filtered by selected rank tiers
-    benchmark = await get_benchmark(role=role, champion=champion, ranks=ranks)
+            d = sums[i // n_fields + 1]
+            for key, value in zip(_SERIES_FIELDS, series[i:i + n_fields]):
+                d[key] += value
+            d["count"] += 1
+
+    # Fetch benchmark means and distributions, filtered by selected rank tiers
+    benchmark, distribution = await asyncio.gather(
+        get_benchmark(role=role, champion=champion, ranks=ranks, patches=patches),
+        get_benchmark_distribution(role=role, champion=champion, ranks=ranks, patches=patches),
+    )
 
     results = []
     for minute in sorted(sums):
@@ -349,15 +735,29 @@ async def get_per_minute_comparison(
         if n == 0:
             continue
         b = benchmark.get(minute, {})
+        player = {
+            "cs":      round(d["cs"] / n, 1),
+            "gold":    round(d["gold"] / n, 0),
+            "xp":      round(d["xp"] / n, 0),
+            "level":   round(d["level"] / n, 1),
+            "kills":   round(d["kills"] / n, 2),
+            "deaths":  round(d["deaths"] / n, 2),
+            "assists": round(d["assists"] / n, 2),
+        }
+        percentiles = {}
+        for key, digest in distribution.get(minute, {}).items():
+            if key in player:
+                position = digest.cdf(player[key])
+                percentiles[key] = round(100 * position) if position is not None else None
         results.append(PerMinuteSnapshot(
             timestamp_minute=minute,
-            player_cs=round(d["cs"] / n, 1),
-            player_gold=round(d["gold"] / n, 0),
-            player_xp=round(d["xp"] / n, 0),
-            player_level=round(d["level"] / n, 1),
-            player_kills=round(d["kills"] / n, 2),
-            player_deaths=round(d["deaths"] / n, 2),
-            player_assists=round(d["assists"] / n, 2),
+            player_cs=player["cs"],
+            player_gold=player["gold"],
+            player_xp=player["xp"],
+            player_level=player["level"],
+            player_kills=player["kills"],
+            player_deaths=player["deaths"],
+            player_assists=player["assists"],
             benchmark_cs=b.get("cs"),
             benchmark_gold=b.get("gold"),
             benchmark_xp=b.get("xp"),
@@ -365,6 +765,13 @@ async def get_per_minute_comparison(
             benchmark_kills=b.get("kills"),
             benchmark_deaths=b.get("deaths"),
             benchmark_assists=b.get("assists"),
+            percentile_cs=percentiles.get("cs"),
+            percentile_gold=percentiles.get("gold"),
+            percentile_xp=percentiles.get("xp"),
+            percentile_level=percentiles.get("level"),
+            percentile_kills=percentiles.get("kills"),
+            percentile_deaths=percentiles.get("deaths"),
+            percentile_assists=percentiles.get("assists"),
         ))
 
     return results
\ No newline at end of file
@@ -0,0 +1,101 @@
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCache:
+    """
+    Key/value cache in a local SQLite file, shared by every process that
+    opens the same path — e.g. the workers of `uvicorn --workers N`.
+
+    The database runs in WAL mode, so readers never wait on a writer and a
+    hit is a single primary-key lookup plus an unpickle. Expiry times are
+    wall-clock (time.time()), which every process agrees on; expired rows
+    read as misses and are deleted by sweep().
+
+    Values are pickled, so only point this at a file the app itself owns.
+    Errors are logged and treated as a miss — the cache must never break a
+    request.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value BLOB NOT NULL,"
+            " expires REAL NOT NULL)"
+        )
+
+    def get_with_ttl(self, key: str) -> tuple[Any, float] | None:
+        """(value, seconds until it expires), or None on a miss."""
+        try:
+            row = self._db.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            remaining = row[1] - time.time() if row is not None else 0
+            if remaining <= 0:
+                self.misses += 1
+                return None
+            value = pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError) as e:
+            logger.warning("Shared cache read failed for %s: %s", key, e)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value, remaining
+
+    def get(self, key: str, default: Any = None) -> Any:
+        found = self.get_with_ttl(key)
+        return found[0] if found is not None else default
+
+    def set(self, key: str, value: Any):
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, blob, time.time() + self.ttl),
+            )
+        except (sqlite3.Error, pickle.PicklingError) as e:
+            logger.warning("Shared cache write failed for %s: %s", key, e)
+
+    def pop(self, key: str):
+        try:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning("Shared cache delete failed for %s: %s", key, e)
+
+    def sweep(self) -> int:
+        """Delete expired rows. Returns how many were removed."""
+        try:
+            return self._db.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),)).rowcount
+        except sqlite3.Error as e:
+            logger.warning("Shared cache sweep failed: %s", e)
+            return 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        try:
+            entries = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        return {
+            "path":      self.path,
+            "entries":   entries,
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one in-flight task.
+
+    The first caller for a key starts the work; everyone who arrives while it
+    is running awaits the same future and gets the same result (or exception).
+    The key is released as soon as the work finishes, so later calls start
+    fresh — caching results is the caller's job.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    def start(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> asyncio.Future:
+        """Start the work for `key`, or join the running one, without waiting
+        for it. The key is registered before this returns."""
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn(*args, **kwargs))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f: self._release(key, f))
+        return fut
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        # Shield so one caller disconnecting doesn't cancel the work for the rest
+        return await asyncio.shield(self.start(key, fn, *args, **kwargs))
+
+    def _release(self, key: Hashable, fut: asyncio.Future):
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        # Mark the exception retrieved in case every waiter was cancelled
+        if not fut.cancelled():
+            fut.exception()
@@ -0,0 +1,199 @@
+import bisect
+import math
+import struct
+from typing import Iterable
+
+# Centroid budget. At 50 a sketch holds ~30 centroids (~500 bytes serialized)
+# and percentile ranks are accurate to within a point or two — plenty for
+# "you are at the 30th percentile".
+COMPRESSION = 50
+
+_HEADER = struct.Struct("<Hdd")
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest, k1 scale function).
+
+    Values are summarized as weighted centroids that are small near the tails
+    and larger around the median. Two digests merge by pooling centroids and
+    re-compressing, so per-rank sketches can be combined into any rank subset
+    without the raw values.
+    """
+
+    def __init__(self, compression: int = COMPRESSION):
+        self.compression = compression
+        self._means: list[float] = []
+        self._weights: list[float] = []
+        self._buffer: list[float] = []
+        self.min = math.inf
+        self.max = -math.inf
+
+    @classmethod
+    def of(cls, values: Iterable[float], compression: int = COMPRESSION) -> "TDigest":
+        digest = cls(compression)
+        digest.update(values)
+        return digest
+
+    @property
+    def count(self) -> float:
+        return sum(self._weights) + len(self._buffer)
+
+    def add(self, value: float):
+        self._buffer.append(value)
+        if len(self._buffer) >= 8 * self.compression:
+            self._flush()
+
+    def update(self, values: Iterable[float]):
+        self._buffer.extend(values)
+        self._flush()
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Fold `other` into this digest in place and return self."""
+        other._flush()
+        if other._weights:
+            self._flush()
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(sorted(zip(
+                self._means + other._means, self._weights + other._weights,
+            )))
+        return self
+
+    @classmethod
+    def merge_all(cls, digests: Iterable["TDigest"]) -> "TDigest":
+        """Pool the centroids of every digest and compress once — cheaper than
+        merging them pairwise when combining many sketches."""
+        merged = None
+        points: list[tuple[float, float]] = []
+        for digest in digests:
+            digest._flush()
+            if merged is None:
+                merged = cls(digest.compression)
+            if digest._weights:
+                merged.min = min(merged.min, digest.min)
+                merged.max = max(merged.max, digest.max)
+                points.extend(zip(digest._means, digest._weights))
+        if merged is None:
+            return cls()
+        if points:
+            points.sort()
+            merged._compress(points)
+        return merged
+
+    # ------------------------------------------------------------------
+    # Compression
+    # ------------------------------------------------------------------
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inv(self, k: float) -> float:
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(2 * math.pi * k / self.compression) + 1) / 2
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        self.min = min(self.min, min(self._buffer))
+        self.max = max(self.max, max(self._buffer))
+        points = sorted([*zip(self._means, self._weights), *((v, 1.0) for v in self._buffer)])
+        self._buffer = []
+        self._compress(points)
+
+    def _compress(self, points: list[tuple[float, float]]):
+        """Greedily merge sorted (mean, weight) points while each centroid
+        stays within one unit of the scale function."""
+        total = sum(w for _, w in points)
+        means, weights = [], []
+        cur_mean, cur_weight = points[0]
+        before = 0.0
+        limit = total * self._k_inv(self._k(0.0) + 1)
+        for mean, weight in points[1:]:
+            if before + cur_weight + weight <= limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                before += cur_weight
+                limit = total * self._k_inv(self._k(before / total) + 1)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self._means, self._weights = means, weights
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _anchors(self) -> tuple[list[float], list[float]]:
+        """Sorted (value, rank position) points to interpolate between: the
+        minimum at 0, each centroid at its midpoint, the maximum at count."""
+        values, positions = [self.min], [0.0]
+        seen = 0.0
+        for mean, weight in zip(self._means, self._weights):
+            values.append(mean)
+            positions.append(seen + weight / 2)
+            seen += weight
+        values.append(self.max)
+        positions.append(seen)
+        return values, positions
+
+    def cdf(self, value: float) -> float | None:
+        """Fraction of values below `value` (ties count half), or None if empty."""
+        self._flush()
+        if not self._weights:
+            return None
+        if value < self.min:
+            return 0.0
+        if value > self.max:
+            return 1.0
+        # Integer stats (kills, level) put many values on exactly the same
+        # mean — count those centroids as ties rather than interpolating.
+        lo = bisect.bisect_left(self._means, value)
+        hi = bisect.bisect_right(self._means, value)
+        if lo < hi:
+            below = sum(self._weights[:lo])
+            return (below + sum(self._weights[lo:hi]) / 2) / sum(self._weights)
+        values, positions = self._anchors()
+        total = positions[-1]
+        lo = bisect.bisect_right(values, value)
+        if lo == len(values):   # value == max, not a centroid mean
+            return 1.0
+        v0, v1 = values[lo - 1], values[lo]
+        p0, p1 = positions[lo - 1], positions[lo]
+        return (p0 + (p1 - p0) * (value - v0) / (v1 - v0)) / total
+
+    def quantile(self, q: float) -> float | None:
+        """Approximate value at quantile q in [0, 1], or None if empty."""
+        self._flush()
+        if not self._weights:
+            return None
+        values, positions = self._anchors()
+        target = min(max(q, 0.0), 1.0) * positions[-1]
+        i = max(bisect.bisect_left(positions, target), 1)
+        p0, p1 = positions[i - 1], positions[i]
+        if p1 == p0:
+            return values[i]
+        return values[i - 1] + (values[i] - values[i - 1]) * (target - p0) / (p1 - p0)
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        self._flush()
+        flat = [x for pair in zip(self._means, self._weights) for x in pair]
+        return _HEADER.pack(self.compression, self.min, self.max) + struct.pack(f"<{len(flat)}d", *flat)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        compression, lo, hi = _HEADER.unpack_from(data)
+        flat = struct.unpack_from(f"<{(len(data) - _HEADER.size) // 8}d", data, _HEADER.size)
+        digest = cls(compression)
+        digest._means = list(flat[0::2])
+        digest._weights = list(flat[1::2])
+        digest.min, digest.max = lo, hi
+        return digest
@@ -0,0 +1,300 @@
+"""
+Query-plan and latency regression checks for the benchmark schema.
+
+Applies db/migrations to an empty local Postgres, seeds a synthetic dataset
+shaped like the pipeline's (SEED_MATCHES matches over PATCHES, 10 participants
+and 6 snapshots each), builds the rollup and sketches, then checks the queries
+behind /timeline and the pipeline's incremental refresh and retention:
+
+  * EXPLAIN shows no sequential scan on the large tables
+  * each query stays within its latency budget (scale with BUDGET_SCALE)
+  * rollup averages equal AVG() over the raw snapshots
+  * the refresh only touches the new matches' patch partitions
+  * dropping a patch's partitions and demoting players who left the
+    rosters stay within budget
+
+The database is wiped first, so it must be a throwaway one whose name
+contains "test":
+
+    TEST_DATABASE_URL=postgresql+asyncpg://postgres@localhost/heimer_test \\
+        python test_benchmark_schema.py
+
+Exits non-zero if any check fails.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+if "test" not in TEST_DATABASE_URL.rsplit("/", 1)[-1]:
+    if __name__ != "__main__":
+        # Collected by pytest; exiting here would abort the whole session
+        import pytest
+        pytest.skip("needs TEST_DATABASE_URL; run as a script", allow_module_level=True)
+    sys.exit("Set TEST_DATABASE_URL to a throwaway database whose name contains 'test' — it is wiped.")
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("DATABASE_SSL", "0")
+
+from sqlalchemy import text
+
+from db.client import (
+    _DEMOTE_UNLISTED,
+    _REFRESH_ROLLUP,
+    _ROLLUP_SNAPSHOTS,
+    engine,
+    ensure_patch_partitions,
+    get_session,
+    refresh_benchmark_rollup,
+)
+from db.migrate import migrate
+from player_scanner.benchmark import (
+    _benchmark_sql,
+    _distribution_sql,
+    _filter_params,
+    _query_benchmark,
+    _query_distribution,
+    refresh_benchmark_sketches,
+)
+
+SEED_MATCHES = int(os.getenv("SEED_MATCHES", "20000"))
+SEED_PLAYERS = 60_000      # every participant PUUID
+RANKED       = 3_000       # of which are benchmark-tier players
+NEW_MATCHES  = 50          # one incremental pipeline refresh
+BUDGET_SCALE = float(os.getenv("BUDGET_SCALE", "1"))
+
+PATCHES = ("15.1", "15.2", "15.3", "15.4")   # match m is on PATCHES[m % 4]
+ALL_RANKS = ("CHALLENGER", "GRANDMASTER", "MASTER")
+BIG_TABLES = {"timeline_snapshots", "participants", "players", "benchmark_rollup", "benchmark_sketches"}
+
+# (role, champion, ranks, patch window) — the shapes /timeline sends
+FILTERS = [
+    (None, None, ALL_RANKS, None),
+    ("MIDDLE", None, ALL_RANKS, None),
+    ("JUNGLE", "Champ7", ALL_RANKS, None),
+    (None, "Champ42", ("CHALLENGER",), None),
+    ("BOTTOM", "Champ3", ("GRANDMASTER", "MASTER"), None),
+    (None, None, ALL_RANKS, ("15.4",)),
+    ("MIDDLE", "Champ12", ALL_RANKS, ("15.4", "15.3")),
+]
+
+failures: list[str] = []
+
+
+def check(ok: bool, label: str, detail: str = ""):
+    print(f"  {'PASS' if ok else 'FAIL'}  {label}{f'  ({detail})' if detail else ''}")
+    if not ok:
+        failures.append(label)
+
+
+# ---------------------------------------------------------------------------
+# Setup
+# ---------------------------------------------------------------------------
+
+async def reset_and_migrate():
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+    await migrate()
+
+
+async def seed(first: int, count: int):
+    """Insert matches [first, first + count) with their participants and snapshots."""
+    params = {"first": first, "last": first + count - 1, "players": SEED_PLAYERS}
+    async with get_session() as db:
+        for patch in PATCHES:
+            await ensure_patch_partitions(db, patch)
+        await db.execute(text("""
+            INSERT INTO matches (match_id, patch, duration, queue, game_timestamp)
+            SELECT 'NA1_' || m, '15.' || (m % 4 + 1), 1500 + m % 900, '420',
+                   NOW() - m * INTERVAL '1 minute'
+            FROM generate_series(CAST(:first AS INTEGER), CAST(:last AS INTEGER)) m
+        """), params)
+        await db.execute(text("""
+            INSERT INTO participants (match_id, patch, puuid, champion, role, win)
+            SELECT 'NA1_' || m, '15.' || (m % 4 + 1), 'p' || ((m * 10 + i) % CAST(:players AS INTEGER)),
+                   'Champ' || ((m * 7 + i * 13) % 160),
+                   (ARRAY['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY'])[i % 5 + 1],
+                   i < 5
+            FROM generate_series(CAST(:first AS INTEGER), CAST(:last AS INTEGER)) m, generate_series(0, 9) i
+        """), params)
+        await db.execute(text("""
+            INSERT INTO timeline_snapshots
+                (match_id, patch, puuid, timestamp_minute, cs, gold, xp, level,
+                 kills, deaths, assists, vision_score, items)
+            SELECT p.match_id, p.patch, p.puuid, t,
+                   (t * 7 + random() * 25)::int, (t * 380 + random() * 900)::int,
+                   (t * 450 + random() * 800)::int, LEAST(18, t / 2 + 2),
+                   (random() * t / 5)::int, (random() * t / 6)::int, (random() * t / 3)::int,
+                   (random() * 60)::int, '[]'
+            FROM participants p
+            CROSS JOIN unnest(ARRAY[5, 10, 15, 20, 25, 30]) t
+            WHERE p.match_id IN (SELECT 'NA1_' || m FROM generate_series(CAST(:first AS INTEGER), CAST(:last AS INTEGER)) m)
+        """), params)
+
+
+async def seed_players():
+    async with get_session() as db:
+        await db.execute(text("""
+            INSERT INTO players (puuid, rank, lp, region)
+            SELECT 'p' || i,
+                   CASE WHEN i < CAST(:ranked AS INTEGER) THEN (ARRAY['CHALLENGER', 'GRANDMASTER', 'MASTER'])[i % 3 + 1]
+                        ELSE 'UNKNOWN' END,
+                   CASE WHEN i < CAST(:ranked AS INTEGER) THEN i % 1500 END,
+                   'na1'
+            FROM generate_series(0, CAST(:players AS INTEGER) - 1) i
+        """), {"ranked": RANKED, "players": SEED_PLAYERS})
+
+
+async def vacuum_analyze():
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+
+
+# ---------------------------------------------------------------------------
+# Plan inspection
+# ---------------------------------------------------------------------------
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+async def explain(clause, params: dict | None = None) -> dict:
+    """EXPLAIN ANALYZE `clause` inside a transaction that is rolled back, so
+    data-modifying statements can be measured without side effects."""
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        result = await conn.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + clause.text), params or {})
+        plan = result.scalar_one()[0]
+        await trans.rollback()
+    return plan
+
+
+def _table(relation: str) -> str:
+    """Parent table of a patch partition (timeline_snapshots_p15_3 -> timeline_snapshots).
+    The *_default partitions only hold matches without a patch and are
+    normally empty, so scanning them is not counted."""
+    for table in BIG_TABLES:
+        if relation == table or relation.startswith(table + "_p"):
+            return table
+    return relation
+
+
+def seq_scans(plan: dict) -> set[str]:
+    return {
+        node["Relation Name"] for node in _nodes(plan["Plan"])
+        if node["Node Type"] == "Seq Scan" and _table(node.get("Relation Name", "")) in BIG_TABLES
+    }
+
+
+def scanned(plan: dict, table: str) -> set[str]:
+    """Partitions of `table` that were actually read (pruned ones never run)."""
+    return {
+        node["Relation Name"] for node in _nodes(plan["Plan"])
+        if _table(node.get("Relation Name", "")) == table and node.get("Actual Loops", 0) > 0
+    }
+
+
+def check_plan(label: str, plan: dict, budget_ms: float):
+    scans = seq_scans(plan)
+    check(not scans, f"{label}: no seq scan on large tables", ", ".join(sorted(scans)))
+    took = plan["Execution Time"]
+    check(took <= budget_ms * BUDGET_SCALE, f"{label}: {took:.2f} ms <= {budget_ms * BUDGET_SCALE:.0f} ms budget")
+
+
+async def median_ms(fn, runs: int = 20) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+# ---------------------------------------------------------------------------
+# Checks
+# ---------------------------------------------------------------------------
+
+async def check_rollup_matches_raw(window: tuple[str, ...]):
+    raw = text("""
+        SELECT ts.timestamp_minute, AVG(ts.cs), AVG(ts.gold), AVG(ts.kills)
+        FROM timeline_snapshots ts
+        JOIN participants p ON ts.patch = p.patch AND ts.match_id = p.match_id AND ts.puuid = p.puuid
+        JOIN players     pl ON ts.puuid = pl.puuid
+        WHERE pl.rank IN ('CHALLENGER', 'GRANDMASTER', 'MASTER') AND UPPER(p.role) = 'MIDDLE'
+          AND ts.patch = ANY(:patches)
+        GROUP BY ts.timestamp_minute
+    """)
+    async with get_session() as db:
+        expected = {
+            row[0]: (round(float(row[1]), 1), round(float(row[2]), 0), round(float(row[3]), 2))
+            for row in (await db.execute(raw, {"patches": list(window)})).fetchall()
+        }
+    rolled = await _query_benchmark("MIDDLE", None, ALL_RANKS, None if window == PATCHES else window)
+    got = {minute: (b["cs"], b["gold"], b["kills"]) for minute, b in rolled.items()}
+    check(got == expected, f"rollup averages equal AVG() over raw snapshots (patches {', '.join(window)})")
+
+
+async def main():
+    print(f"Migrating and seeding {SEED_MATCHES:,} matches...")
+    started = time.perf_counter()
+    await reset_and_migrate()
+    await seed_players()
+    await seed(0, SEED_MATCHES)
+    await vacuum_analyze()
+    print(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    async with get_session() as db:
+        rolled_up = await refresh_benchmark_rollup(db)
+        sketches = await refresh_benchmark_sketches(db, rolled_up)
+    await vacuum_analyze()
+    print(f"  rollup backfill of {len(rolled_up):,} matches + {sketches:,} sketches in {time.perf_counter() - started:.1f}s\n")
+
+    print("Benchmark reads (/timeline):")
+    await check_rollup_matches_raw(PATCHES)
+    await check_rollup_matches_raw(("15.4", "15.3"))
+    for role, champion, ranks, window in FILTERS:
+        label = f"role={role} champion={champion} ranks={len(ranks)} patches={len(window) if window else 'all'}"
+        params = _filter_params(role, champion, window)
+        check_plan(f"get_benchmark {label}", await explain(_benchmark_sql(ranks, window), params), 5)
+        check_plan(f"distribution {label}", await explain(_distribution_sql(ranks, window), params), 5)
+        took = await median_ms(lambda: _query_benchmark(role, champion, ranks, window))
+        check(took <= 15 * BUDGET_SCALE, f"get_benchmark {label}: median {took:.2f} ms round trip <= {15 * BUDGET_SCALE:.0f} ms")
+        took = await median_ms(lambda: _query_distribution(role, champion, ranks, window))
+        check(took <= 30 * BUDGET_SCALE, f"distribution {label}: median {took:.2f} ms round trip <= {30 * BUDGET_SCALE:.0f} ms")
+
+    print("\nPipeline incremental refresh:")
+    await seed(SEED_MATCHES, NEW_MATCHES)
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE matches, participants, timeline_snapshots"))
+    check_plan(f"refresh_benchmark_rollup ({NEW_MATCHES} new matches)", await explain(_REFRESH_ROLLUP), 500)
+    # Only the newest patch's matches, as on a normal day
+    new_ids = [f"NA1_{m}" for m in range(SEED_MATCHES, SEED_MATCHES + NEW_MATCHES) if m % 4 == 3]
+    plan = await explain(_ROLLUP_SNAPSHOTS, {"patches": ["15.4"], "match_ids": new_ids, "ranks": list(ALL_RANKS)})
+    check_plan(f"get_rollup_snapshots ({len(new_ids)} matches)", plan, 100)
+    partitions = scanned(plan, "timeline_snapshots")
+    check(partitions == {"timeline_snapshots_p15_4"}, "get_rollup_snapshots reads only the new patch's partition",
+          ", ".join(sorted(partitions)))
+
+    print("\nRetention:")
+    # EXPLAIN ANALYZE runs the drop; explain() rolls it back again
+    check_plan("drop_patch_partitions (one patch)", await explain(text("SELECT drop_patch_partitions('15.1')")), 200)
+    # Every ranked player but one is still on the rosters
+    roster = [f"p{i}" for i in range(1, RANKED)]
+    check_plan("demote_unlisted_players (one dropped out)", await explain(_DEMOTE_UNLISTED, {"puuids": roster}), 50)
+
+    await engine.dispose()
+    print(f"\n{len(failures)} check(s) failed." if failures else "\nAll checks passed.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())